@@ -0,0 +1,104 @@
+from datetime import timedelta
+from PyQt5 import uic
+from PyQt5.QtCore import QDate
+from PyQt5.QtWidgets import QMainWindow, QDesktopWidget
+from apps.apartments.models.apartments_mdl import xQTableView
+from common.data.constants import ANALYTICS_VIEW_PATH
+from common.managers.analytics_mgr import GROUPS, COLUMNS
+from common.managers.language_mgr import get_lang_manager
+
+
+class AnalyticsController:
+    ''' Occupancy and revenue of apartments, agencies or owners over a
+    period, computed in background and cached by the analytics manager of
+    the application controller '''
+
+    def __init__(self, app_controller):
+        self.view = uic.loadUi(ANALYTICS_VIEW_PATH, QMainWindow())
+        self.app_controller = app_controller
+        self.analytics_mgr = app_controller.analytics_mgr
+        self.lang_manager = get_lang_manager()
+        self.table = self.view.analytics_table
+        self.table.__class__ = xQTableView
+        self.table.__init__()
+
+        year = QDate.currentDate().year()
+        self.view.from_date.setDate(QDate(year, 1, 1))
+        self.view.to_date.setDate(QDate(year, 12, 31))
+        for group in GROUPS:
+            self.view.group_cbx.addItem(group, group)
+
+        self.view.group_cbx.currentIndexChanged.connect(self.load_report)
+        self.view.from_date.dateChanged.connect(
+            self.view.to_date.setMinimumDate)
+        self.view.from_date.dateChanged.connect(self.load_report)
+        self.view.to_date.dateChanged.connect(self.load_report)
+
+    def load_report(self):
+        ''' Show the report of the selected period, computing it in
+        background unless it is cached '''
+
+        group = self.view.group_cbx.currentData()
+        first = self.view.from_date.date().toPyDate()
+        last = self.view.to_date.date().toPyDate()
+        if (report := self.analytics_mgr.get_report(group, first, last)):
+            self.show_report(report)
+            return
+        self.app_controller.worker_mgr.run(
+            'analytics', self.set_report, self.analytics_mgr.load_report,
+            group, first, last)
+
+    def set_report(self, report):
+        self.analytics_mgr.set_report(report)
+        self.show_report(report)
+
+    def show_report(self, report):
+        ''' Load the rows of each member in the table and the totals and
+        daily occupancy in the labels '''
+
+        translate = self.lang_manager.translate
+        headers = [translate(report['group'])]
+        headers += [translate(x) for x in COLUMNS]
+        rows = [
+            [x, int(y[0]), int(y[1]), *y[2:]]
+            for x, y in zip(report['names'], report['rows'])]
+        self.table.load_data(rows, headers)
+
+        totals = [f'{x:,.0f}' for x in report['total'][:2]]
+        totals += [f'{x:,.2f}' for x in report['total'][2:]]
+        self.view.total_txt.setText('   '.join(
+            f'{translate(x)}: {y}' for x, y in zip(COLUMNS, totals)))
+
+        daily = report['daily']
+        if not len(daily):
+            self.view.occupancy_txt.setText('')
+            return
+        date = lambda x: report['first'] + timedelta(days=int(x))
+        peak, lowest = daily.argmax(), daily.argmin()
+        self.view.occupancy_txt.setText(
+            f'{translate("occupancy")}   '
+            f'{translate("average")}: {daily.mean():.2f}   '
+            f'{translate("peak")}: {daily[peak]:.2f} ({date(peak)})   '
+            f'{translate("lowest")}: {daily[lowest]:.2f} ({date(lowest)})')
+
+    def translate_screen(self, lang):
+        self.lang_manager.change_language(lang)
+        self.view.setWindowTitle(self.lang_manager.translate('analytics_btn'))
+        labels = (self.view.group_lbl, self.view.from_lbl, self.view.to_lbl)
+        for widget in labels:
+            widget.setText(self.lang_manager.translate(widget.objectName()))
+        for i, group in enumerate(GROUPS):
+            self.view.group_cbx.setItemText(
+                i, self.lang_manager.translate(group))
+
+    def show_view(self):
+        rectangle = self.view.frameGeometry()
+        point = QDesktopWidget().availableGeometry(1).center()
+        rectangle.moveCenter(point)
+        self.view.move(rectangle.topLeft())
+        self.view.show()
+
+    def start(self):
+        self.translate_screen(self.app_controller.act_lang)
+        self.load_report()
+        self.show_view()
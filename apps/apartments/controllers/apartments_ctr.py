@@ -1,22 +1,38 @@
+from timeit import default_timer as timer
+START_TIME = timer()  # Taken before the imports to measure them
+
 import os
 import sys
 import subprocess
 from os.path import exists
-from pandas import DataFrame
 from PyQt5 import uic
-from PyQt5.Qt import *
 from PyQt5.QtGui import *
 from PyQt5.QtCore import *
 from PyQt5.QtWidgets import *
-from PyQt5.QtPrintSupport import *
 from PyQt5.QtWidgets import QApplication
 from apps.apartments.models.apartments_mdl import *
 from common.connections.alchemy_cn import *
 from common.managers.theme_mgr import ThemeManager
-from common.managers.language_mgr import LangManager
+from common.managers.language_mgr import get_lang_manager
+from common.managers.index_mgr import IndexManager
+from common.managers.lookup_mgr import LookupManager
+from common.managers.prefetch_mgr import PrefetchManager
+from common.managers.instance_mgr import InstanceManager
+from common.managers.availability_mgr import AvailabilityManager
+from common.managers.schedule_mgr import ScheduleManager
+from common.managers.analytics_mgr import AnalyticsManager
+from common.managers.startup_mgr import StartupManager
+from common.managers.profile_mgr import ProfileManager
+from common.managers.export_mgr import ExportManager
+from common.managers.print_mgr import PrintManager
+from common.managers.worker_mgr import WorkerManager, install_qt_loop
+from common.connections.async_cn import fetch_screen
 from apps.apartments.controllers.form_ctr import FormController
 from apps.apartments.controllers.city_form_ctr import CityFormController
-from common.data.constants import APT_VIEW_PATH, EXPORTS_PATH
+from apps.apartments.controllers.analytics_ctr import AnalyticsController
+from common.data.constants import APT_VIEW_PATH, EXPORTS_PATH, SEARCH_DELAY
+from common.data.constants import SEARCH_INDEX, ASYNC_DB, PREFETCH_ROWS
+from common.data.constants import PRINT_PREVIEW_PAGES
 
 
 class ApartmentsController:
@@ -26,10 +42,23 @@ class ApartmentsController:
         self.app = app
         self.view = uic.loadUi(APT_VIEW_PATH, QMainWindow())
 
-        self.lang_mgr = LangManager()
+        self.lang_mgr = get_lang_manager()
         self.theme_mgr = ThemeManager(self)
+        self.lookup_mgr = LookupManager()
+        self.prefetch_mgr = PrefetchManager()
+        self.instance_mgr = InstanceManager()
+        self.availability_mgr = AvailabilityManager()
+        self.schedule_mgr = ScheduleManager()
+        self.analytics_mgr = AnalyticsManager()
+        self.worker_mgr = WorkerManager()
+        self.async_db = ASYNC_DB and self.worker_mgr.has_qt_loop()
+        self.profile_mgr = ProfileManager(
+            self.worker_mgr, self.view.statusBar())
+        self.export_mgr = ExportManager()
+        self.print_mgr = PrintManager()
         self.form_controller = FormController
         self.city_form_controller = CityFormController
+        self.analytics_controller = None
 
         self.layouts = self.get_widgets_group('field_lay', QLayout)
         self.labels = self.get_widgets_group('field_lbl', QLabel)
@@ -44,6 +73,10 @@ class ApartmentsController:
         self.attachments_list = self.view.files_lst
         self.field_id = self.view.id_edit
         self.field_notes = self.view.notes_edit
+        self.top_search_timer = QTimer()
+        self.sub_search_timer = QTimer()
+        self.top_index = IndexManager() if SEARCH_INDEX else None
+        self.sub_index = IndexManager() if SEARCH_INDEX else None
 
         self.top_model = None
         self.sub_model = None
@@ -51,6 +84,11 @@ class ApartmentsController:
         self.sub_query = None
         self.top_data = None
         self.sub_data = None
+        self.top_count = None
+        self.top_last_id = None
+        self.form_widgets = {}
+        self.form_model = None
+        self.new_form = False
         self.act_table = None
         self.act_model = None
         self.act_lang = None
@@ -62,28 +100,30 @@ class ApartmentsController:
         self.build_menubar()
         self.connect_signals()
 
-        self.change_reservation()
-        self.change_app_theme('blue')
-        self.change_app_style('fusion')
-        self.translate_app('spanish')
+        with self.profile_mgr.action('startup'):
+            self.change_reservation()
+            self.change_app_theme('blue')
+            self.change_app_style('fusion')
+            self.translate_app('spanish')
 
     def try_function(function):
         ''' Generic try-catch wrapper '''
 
         def wrapper(*args, **kwargs):
+            self = args[0]
             try:
-                result = function(*args, **kwargs)
+                with self.profile_mgr.action(function.__name__):
+                    result = function(*args, **kwargs)
                 return result
             except Exception as exc:
-                self = args[0]
                 self.show_error_message()
         return wrapper
 
     def modify_widgets_class(self):
         ''' Add extended classes to widgets '''
 
-        self.top_table.__class__ = xQTableWidget
-        self.sub_table.__class__ = xQTableWidget
+        self.top_table.__class__ = xQTableView
+        self.sub_table.__class__ = xQTableView
         self.field_id.__class__ = xQIdLineEdit
         self.field_notes.__class__ = xQNotesTextEdit
         self.attachments_list.__class__ = xQListWidget
@@ -97,6 +137,9 @@ class ApartmentsController:
         self.field_notes.__init__()
         function = self.add_docs_to_db_and_list
         self.attachments_list.__init__(function)
+        for timer in (self.top_search_timer, self.sub_search_timer):
+            timer.setSingleShot(True)
+            timer.setInterval(SEARCH_DELAY)
 
     def modify_nav_buttons(self):
         ''' Set Checkable buttons properties '''
@@ -152,6 +195,7 @@ class ApartmentsController:
             (v.agency_nav_btn, s.change_agency),
             (v.owner_nav_btn, s.change_owner),
             (v.apartment_nav_btn, s.change_apartment),
+            (v.analytics_btn, s.open_analytics),
             (v.clear_btn, s.reset_form_widgets),
             (v.cancel_btn, s.cancel_form_edition),
             (v.save_btn, s.save_instance),
@@ -163,6 +207,7 @@ class ApartmentsController:
             (v.top_delete_btn, s.delete_top_row),
             (v.sub_delete_btn, s.delete_sub_row),
             (v.top_export_btn, s.export_top_data),
+            (v.top_assign_btn, s.assign_services),
             (v.sub_export_btn, s.export_sub_data),
             (v.top_print_btn, s.print_top_data),
             (v.sub_print_btn, s.print_sub_data),
@@ -173,16 +218,32 @@ class ApartmentsController:
             (s.top_table, lambda: s.navigate_top()),
             (s.sub_table, lambda: s.navigate_sub())]
 
+        track = self.profile_mgr.track
         for widget, function in clicked_groups:
-            widget.clicked.connect(function)
+            widget.clicked.connect(track(widget.objectName(), function))
 
         changed_groups = [
-            (s.top_search, s.search_top_table),
-            (s.sub_search, s.search_sub_table)]
+            (s.top_search, s.top_search_timer.start),
+            (s.sub_search, s.sub_search_timer.start)]
 
         for widget, function in changed_groups:
             widget.textChanged.connect(function)
 
+        timeout_groups = [
+            (s.top_search_timer, s.search_top_table),
+            (s.sub_search_timer, s.search_sub_table)]
+
+        for timer, function in timeout_groups:
+            timer.timeout.connect(track(function.__name__, function))
+
+        self.worker_mgr.busy_changed.connect(self.show_loading)
+        self.export_mgr.progress.connect(
+            lambda *args: self.show_progress('top_export_btn', *args))
+        self.print_mgr.progress.connect(
+            lambda *args: self.show_progress('top_print_btn', *args))
+        self.worker_mgr.failed.connect(lambda exc: self.show_error_message())
+        self.app.aboutToQuit.connect(self.worker_mgr.shutdown)
+
     def change_reservation(self):
         ''' Set Reservation screen variables '''
 
@@ -191,6 +252,7 @@ class ApartmentsController:
         self.top_query = res_top_query()
         self.sub_query = res_sub_query()
         self.reset_screen()
+        self.load_availability()
 
     def change_service(self):
         ''' Set Service screen variables '''
@@ -246,21 +308,36 @@ class ApartmentsController:
         self.sub_query = apt_sub_query()
         self.reset_screen()
 
-    def reset_screen(self):
-        ''' Reset top data and call navigate '''
-
-        self.top_search.setText(None)
-        self.load_top_data()
-        self.navigate_top()
+    def reset_screen(self, changed_id=None):
+        ''' Reset top data, navigate once it is loaded '''
+
+        self.worker_mgr.cancel_all(keep=[
+            'delete', 'export', 'print', 'assign', 'analytics',
+            'availability'])
+        self.view.top_assign_btn.setVisible(self.top_model == Service)
+        self.clear_search(self.top_search, self.top_search_timer)
+        if changed_id:
+            self.prefetch_mgr.invalidate()
+        if changed_id and self.act_model == self.top_model:
+            self.refresh_top_data(changed_id)
+        else:
+            self.load_top_data()
 
-    def navigate_top(self, step=0):
+    def navigate_top(self, step=0, sub_rows=None):
         ''' Set top table and model '''
 
         self.act_table = self.top_table
         self.act_model = self.top_model
-        self.sub_search.setText(None)
+        self.clear_search(self.sub_search, self.sub_search_timer)
         self.change_top_row(step)
-        self.load_sub_data()
+        top_id = self.top_table.get_selected_id()
+        if sub_rows is None:
+            sub_rows = self.prefetch_mgr.get_sub_rows(top_id)
+        if sub_rows is None:
+            self.load_sub_data()
+        else:
+            self.worker_mgr.cancel('sub')
+            self.show_sub_data(sub_rows)
         self.build_and_load_form()
 
     def navigate_sub(self, step=0):
@@ -275,32 +352,52 @@ class ApartmentsController:
         ''' Call form building and load form data '''
 
         self.build_form()
-        self.load_form_combos()
         self.load_form_data()
 
     def build_form(self):
-        ''' Build form elements dinamically '''
+        ''' Place the active model form, building it only the first time '''
 
+        if self.act_model == self.form_model:
+            return
         self.clear_form_layouts()
+        if self.act_model not in self.form_widgets:
+            self.form_widgets[self.act_model] = self.create_form_widgets()
+
         index = 0
-        for qtype in self.act_model.qtypes:
-            if QToolButton in qtype.__bases__:
-                widget = qtype(self)
+        for widget in self.form_widgets[self.act_model]:
+            if isinstance(widget, QToolButton):
                 index -= 1  # Place button in previous layout
             else:
-                widget = self.create_form_widget(index, qtype)
                 self.rename_form_label(index, widget)
 
             self.layouts[index].addWidget(widget)
+            widget.show()
             index += 1
         self.reset_form_labels(self.labels, index)
+        self.form_model = self.act_model
+
+    def create_form_widgets(self):
+        ''' Return the form widgets of the active model in layout order '''
+
+        widgets = []
+        index = 0
+        for qtype in self.act_model.qtypes:
+            if QToolButton in qtype.__bases__:
+                widget = qtype(self)
+                index -= 1
+            else:
+                widget = self.create_form_widget(index, qtype)
+
+            widgets.append(widget)
+            index += 1
+        return widgets
 
     def clear_form_layouts(self):
-        ''' Delete form widgets from layouts '''
+        ''' Take form widgets out of layouts and keep them hidden '''
 
         for layout in self.layouts:
             while (item:= layout.takeAt(0)):
-                item.widget().deleteLater()
+                item.widget().hide()
 
     def create_form_widget(self, index, qtype):
         ''' Return instance of QType with field attribute '''
@@ -327,33 +424,87 @@ class ApartmentsController:
     def load_form_combos(self):
         ''' Load database combo info '''
 
-        for combo in self.form.findChildren(xQComboBox):
-            with alch_session() as session:
-                instances = session.query(combo.get_model()).all()
-            for instance in instances:
-                combo.addItem(combo.get_text(instance), instance.id)
+        widgets = self.form_widgets.get(self.form_model, [])
+        combos = [x for x in widgets if isinstance(x, xQComboBox)]
+        lookups = self.lookup_mgr.get_lookups(combos)
+        for combo in combos:
+            if combo.lookups is (lookup:= lookups[combo.get_model()]):
+                continue  # Items are still up to date
+            combo.clear()
+            for instance_id, text in lookup:
+                combo.addItem(text, instance_id)
+            combo.lookups = lookup
 
     def load_form_data(self):
-        ''' Retrieve data for active table and id'''
-
-        selected_items = self.act_table.selectedItems()
-        if selected_items and (act_id := int(selected_items[0].text())):
-            act_instance = self.get_db_instance(act_id)
-            self.set_widgets_value(act_instance)
-            self.reset_attachments_list()
+        ''' Retrieve combos and data for active table and id in background '''
+
+        self.new_form = False
+        act_id = self.act_table.get_selected_id()
+        widgets = self.form_widgets.get(self.form_model, [])
+        combos = [x for x in widgets if isinstance(x, xQComboBox)]
+        missing = self.lookup_mgr.get_missing(combos)
+        prefetched = None
+        if self.act_table == self.top_table:
+            prefetched = self.prefetch_mgr.get_form_data(act_id)
+        if prefetched and not missing:
+            self.worker_mgr.cancel('form')
+            return self.show_form_data(({}, *prefetched))
+        instance = None
+        if act_id and not prefetched:
+            instance = self.instance_mgr.get(self.act_model, act_id)
+        self.worker_mgr.run(
+            'form', self.show_form_data, self.fetch_form_data,
+            self.act_model, act_id, missing, prefetched, instance)
+
+    def fetch_form_data(
+            self, model, act_id, missing, prefetched=None, instance=None):
+        ''' Return missing lookups, instance and its documents paths.
+        The instance is only queried if it is neither prefetched nor cached '''
+
+        lookups = self.lookup_mgr.load_lookups(missing) if missing else {}
+        instance, paths = prefetched or (instance, [])
+        if act_id and not prefetched:
+            with read_session() as session:
+                if instance is None:
+                    condition = (model.id == act_id)
+                    query = session.query(model).filter(condition)
+                    instance = query.first()
+                if instance:
+                    entity_id = instance.entity_id
+                    condition = (Document.foreign_entity_id == entity_id)
+                    query = session.query(Document.file_path)
+                    paths = [x for x, in query.filter(condition)]
+        return lookups, instance, paths
+
+    def show_form_data(self, result):
+        ''' Fill form combos and widgets with the fetched data '''
+
+        lookups, instance, paths = result
+        self.lookup_mgr.add_lookups(lookups)
+        self.load_form_combos()
+        if self.new_form:
+            return  # The user started a new record meanwhile
+        if instance:
+            self.instance_mgr.add(instance)
+            self.set_widgets_value(instance)
+            self.attachments_list.clear()
+            self.attachments_list.addItems(paths)
         else:
             self.reset_form_widgets()
             self.field_id.setText(None)
 
     @try_function
     def get_db_instance(self, act_id):
-        ''' Get active instance from database '''
-
-        with alch_session() as session:
-            model = self.act_model
-            condition = (model.id == act_id)
-            instance = session.query(model).filter(condition).first()
-            return instance
+        ''' Get active instance from the cache or the database '''
+
+        model = self.act_model
+        if (instance := self.instance_mgr.get(model, act_id)) is None:
+            with read_session() as session:
+                condition = (model.id == act_id)
+                instance = session.query(model).filter(condition).first()
+            if instance:
+                self.instance_mgr.add(instance)
+        return instance
 
     def set_widgets_value(self, instance):
         ''' Set display widgets info '''
@@ -375,8 +526,12 @@ class ApartmentsController:
         ''' Move top selection from the end to the beginning and viceversa '''
 
         if self.top_data:
-            act_row = self.top_table.currentRow()
-            if (i:= (act_row + step)) == (end:= len(self.top_data)):
+            model = self.top_table.model()
+            act_row = self.top_table.currentIndex().row()
+            if (i:= (act_row + step)) == model.rowCount():
+                if model.canFetchMore():
+                    model.fetchMore()
+            if i == (end:= model.rowCount()):
                 new_row = 0
             elif i < 0:
                 new_row = end - 1
@@ -388,8 +543,12 @@ class ApartmentsController:
         ''' Move sub selection from the end to the beginning and viceversa '''
 
         if self.sub_data:
-            act_row = self.sub_table.currentRow()
-            if (i:= (act_row + step)) == (end:= len(self.sub_data)):
+            model = self.sub_table.model()
+            act_row = self.sub_table.currentIndex().row()
+            if (i:= (act_row + step)) == model.rowCount():
+                if model.canFetchMore():
+                    model.fetchMore()
+            if i == (end:= model.rowCount()):
                 new_row = 0
             elif i < 0:
                 new_row = end - 1
@@ -397,85 +556,190 @@ class ApartmentsController:
                 new_row = i
             self.sub_table.selectRow(new_row)
 
-    @try_function
     def load_top_data(self):
-        ''' Load top data and reset top widgets '''
+        ''' Load first top page in background '''
+
+        if self.async_db:
+            return self.worker_mgr.run_async(
+                'top', self.show_screen_data, fetch_screen,
+                self.top_query, self.sub_query, self.top_model)
+        self.worker_mgr.run(
+            'top', self.show_top_data, self.fetch_top_data,
+            self.top_query, self.top_model, self.sub_query)
+
+    def fetch_top_data(self, query, model, sub_query=None):
+        ''' Return first top page, the total of top rows and, if sub_query
+        is given, the prefetched data of the first PREFETCH_ROWS rows '''
+
+        with read_session() as session:
+            query = query.with_session(session)
+            rows = page_query(query, model).all()
+            prefetched = {}
+            if sub_query is not None and PREFETCH_ROWS:
+                top_ids = [x[0] for x in rows[:PREFETCH_ROWS]]
+                prefetched = self.prefetch_mgr.load_rows(
+                    session, sub_query, model, top_ids)
+            return rows, count_query(query, model), prefetched
+
+    def show_top_data(self, result, sub_rows=None):
+        ''' Reset top widgets with the first page and navigate '''
+
+        self.top_data, self.top_count, prefetched = result
+        self.prefetch_mgr.set_rows(prefetched)
+        self.top_last_id = self.top_data[-1][0] if self.top_data else None
+        if self.top_index is not None:
+            self.top_index.build(self.top_data)
+        self.load_top_widgets()
+        first_id = self.top_data[0][0] if self.top_data else None
+        if self.top_table.get_selected_id() != first_id:
+            sub_rows = None  # Rows sorted by the user, first row changed
+        self.navigate_top(sub_rows=sub_rows)
+
+    def show_screen_data(self, result):
+        ''' Reset top and sub widgets with rows fetched concurrently '''
+
+        top_rows, top_count, sub_rows = result
+        self.show_top_data((top_rows, top_count, {}), sub_rows)
 
-        self.top_data = self.top_query.all()
+    @try_function
+    def fetch_top_page(self):
+        ''' Load the top page following the last loaded row '''
+
+        query = page_query(self.top_query, self.top_model, self.top_last_id)
+        with read_session() as session:
+            rows = query.with_session(session).all()
+        if rows:
+            self.top_last_id = rows[-1][0]
+            if self.top_index is not None:
+                for row in rows:
+                    self.top_index.add(row)
+        return rows
+
+    def refresh_top_data(self, top_id):
+        ''' Patch one row in the top index or reload all top data '''
+
+        if self.top_index is None or top_id not in self.top_index.rows:
+            return self.load_top_data()
+        self.worker_mgr.run(
+            'top', lambda result: self.show_top_row(top_id, result),
+            self.fetch_top_row, self.top_query, self.top_model, top_id)
+
+    def fetch_top_row(self, query, model, top_id):
+        ''' Return one top row, or None if deleted, and the top total '''
+
+        with read_session() as session:
+            query = query.with_session(session)
+            row = query.filter(model.id == top_id).first()
+            return row, count_query(query, model)
+
+    def show_top_row(self, top_id, result):
+        ''' Patch the top index with the fetched row and navigate '''
+
+        row, self.top_count = result
+        self.top_index.refresh(top_id, row)
+        self.top_data = self.search_top_rows(self.top_search.text())
         self.load_top_widgets()
+        self.navigate_top()
 
     def load_top_widgets(self):
         ''' Load top table and top total '''
 
-        self.load_table(self.top_table, self.top_data)
-        self.top_total.setText(str(len(self.top_data)))
+        if self.top_search.text():
+            fetch, total = None, len(self.top_data)
+        else:
+            fetch, total = self.fetch_top_page, self.top_count
+        self.load_table(self.top_table, self.top_data, self.top_query, fetch)
+        self.top_total.setText(str(total))
 
-    @try_function
     def load_sub_data(self):
-        ''' Load sub data and reset sub widgets '''
+        ''' Load sub data of the selected top row in background '''
+
+        top_id = self.top_table.get_selected_id()
+        self.worker_mgr.run(
+            'sub', self.show_sub_data, self.fetch_sub_data,
+            self.sub_query, self.top_model, top_id)
+
+    def fetch_sub_data(self, query, model, top_id):
+        ''' Return sub rows of a top row '''
+
+        with read_session() as session:
+            condition = (model.id == top_id)
+            return query.with_session(session).filter(condition).all()
 
-        top_id = int(self.top_table.selectedItems()[0].text())
-        condition = (self.top_model.id == top_id)
-        self.sub_data = self.sub_query.filter(condition).all()
+    def show_sub_data(self, rows):
+        ''' Reset sub widgets with the fetched rows '''
+
+        self.sub_data = rows
+        if self.sub_index is not None:
+            self.sub_index.build(self.sub_data)
         self.load_sub_widgets()
 
     def load_sub_widgets(self):
         ''' Load sub table and sub total '''
 
-        self.load_table(self.sub_table, self.sub_data)
+        self.load_table(self.sub_table, self.sub_data, self.sub_query)
         self.sub_total.setText(str(len(self.sub_data)))
 
-    def load_table(self, table, data):
-        ''' Build top or sub table and format size '''
+    def load_table(self, table, data, query, fetch=None):
+        ''' Set top or sub table model and format size '''
 
-        if not len(data):
-            table.setRowCount(0)
-        else:
-            table.setColumnCount(len(data[0]))
-            table.setRowCount(len(data))
-            columns = [x for x in data[0].keys()]
-            columns = [self.lang_mgr.translate(x) for x in columns]
-            table.setHorizontalHeaderLabels(columns)
-            for r, row in enumerate(data):
-                for c, column in enumerate(row):
-                    table.setItem(r, c, QTableWidgetItem(str(column)))
-                    table.setRowHeight(r, 10)
-            table.resizeColumnsToContents()
-            table.selectRow(0)
+        columns = [x['name'] for x in query.column_descriptions]
+        columns = self.lang_mgr.translate_many(columns)
+        with self.profile_mgr.render(len(data)):
+            table.load_data(data, columns, fetch)
+            if len(data):
+                table.resizeColumnsToContents()
+                table.selectRow(0)
+
+    def clear_search(self, search, timer):
+        ''' Empty search widget without triggering a new search '''
+
+        timer.stop()
+        search.blockSignals(True)
+        search.setText(None)
+        search.blockSignals(False)
 
     def search_top_table(self):
         ''' Top search widget function '''
 
         if self.act_table != self.top_table:
-            self.sub_search.setText(None)
+            self.clear_search(self.sub_search, self.sub_search_timer)
             self.act_table = self.top_table
             self.act_model = self.top_model
             self.build_form()
-            self.load_form_combos()
-        self.load_top_data()
-        text = self.top_search.text()
-        items = self.top_table.findItems(text, Qt.MatchContains)
-        id_list = [int(self.top_table.item(x.row(), 0).text()) for x in items]
-        condition = self.top_model.id.in_(id_list)
-        self.load_top_widgets_and_form(condition)
+        if not (text := self.top_search.text()):
+            return self.load_top_data()  # Paged again from the first page
+        self.load_top_widgets_and_form(text)
         self.reset_sub_widgets()
 
     @try_function
-    def load_top_widgets_and_form(self, condition):
+    def load_top_widgets_and_form(self, text):
         ''' Get top data ready and reload top widgets and form '''
 
-        self.top_data = self.top_query.filter(condition).all()
+        self.top_data = self.search_top_rows(text)
         self.load_top_widgets()
         self.load_form_data()
 
+    def search_top_rows(self, text):
+        ''' Return the top rows matching text. The index only holds the
+        pages loaded so far, so it searches once every top row is in it '''
+
+        index = self.top_index
+        if index is not None and (
+                not text or len(index.rows) >= self.top_count):
+            return index.search(text)
+        query = search_query(self.top_query, text)
+        with read_session() as session:
+            return query.with_session(session).all()
+
     def reset_sub_widgets(self):
         ''' Load sub table and sub total '''
         
         if self.top_data:
             self.load_sub_data()
         else:
-            self.sub_table.setRowCount(0)
-            self.sub_total.setText('0')
+            self.sub_data = []
+            self.load_sub_widgets()
 
     def search_sub_table(self):
         ''' Sub search widget function '''
@@ -484,19 +748,21 @@ class ApartmentsController:
             self.act_table = self.sub_table
             self.act_model = self.sub_model
             self.build_form()
-            self.load_form_combos()
-        self.load_sub_data()
         text = self.sub_search.text()
-        items = self.sub_table.findItems(text, Qt.MatchContains)
-        id_list = [int(self.sub_table.item(x.row(), 0).text()) for x in items]
-        condition = self.sub_model.id.in_(id_list)
-        self.load_sub_widgets_and_form(condition)
+        self.load_sub_widgets_and_form(text)
 
     @try_function
-    def load_sub_widgets_and_form(self, condition):
+    def load_sub_widgets_and_form(self, text):
         ''' Get sub data ready and reload sub widgets and form '''
 
-        self.sub_data = self.sub_query.filter(condition).all()
+        if self.sub_index is not None:
+            self.sub_data = self.sub_index.search(text)
+        else:
+            top_id = self.top_table.get_selected_id()
+            condition = (self.top_model.id == top_id)
+            query = search_query(self.sub_query.filter(condition), text)
+            with read_session() as session:
+                self.sub_data = query.with_session(session).all()
         self.load_sub_widgets()
         self.load_form_data()
 
@@ -512,29 +778,86 @@ class ApartmentsController:
         ''' Delete top row and reload both tables '''
 
         if self.top_data:
-            top_id = int(self.top_table.selectedItems()[0].text())
+            top_id = self.top_table.get_selected_id()
             if self.show_confirmation_message():
-                self.delete_row_from_db(self.top_model, top_id)
-                self.load_top_data()
-                self.load_sub_data()
+                self.delete_row(self.top_model, top_id)
 
     def delete_sub_row(self):
         ''' Delete sub row and reload sub table '''
 
         if self.sub_data:
-            sub_id = int(self.sub_table.selectedItems()[0].text())
+            sub_id = self.sub_table.get_selected_id()
             if self.show_confirmation_message():
-                self.delete_row_from_db(self.sub_model, sub_id)
-                self.load_sub_data()
+                self.delete_row(self.sub_model, sub_id)
+
+    def delete_row(self, model, instance_id):
+        ''' Delete record in background and reload its table '''
+
+        callback = lambda _: self.reload_after_delete(model, instance_id)
+        self.worker_mgr.run(
+            'delete', callback, self.delete_row_from_db, model, instance_id)
 
-    @try_function
     def delete_row_from_db(self, model, instance_id):
         ''' Delete record from database '''
         
-        with alch_session() as session:
+        with unit_of_work() as session:
             condition = (model.id == instance_id)
             session.query(model).filter(condition).delete()
 
+    def reload_after_delete(self, model, instance_id):
+        ''' Drop cached data of the deleted record and reload its table '''
+
+        self.invalidate_caches(model, instance_id)
+        if model == self.top_model:
+            self.refresh_top_data(instance_id)
+        else:
+            self.load_sub_data()
+
+    def invalidate_caches(self, model=None, instance_id=None):
+        ''' Drop the cached data a deleted record may be part of. Without
+        model, as for the records of the form screens, everything goes '''
+
+        clear_count_cache()
+        self.lookup_mgr.invalidate()
+        self.prefetch_mgr.invalidate()
+        self.instance_mgr.invalidate(model, instance_id)
+        if model == Reservation:
+            self.availability_mgr.remove(instance_id)
+        elif model != Service:
+            self.availability_mgr.invalidate()  # Reservations may cascade
+        self.analytics_mgr.invalidate()
+
+    def assign_services(self):
+        ''' Create the missing check-in and check-out services, with free
+        employees, in background. Clicks while it runs are ignored, since
+        a second run would not see the services of the first one '''
+
+        if 'assign' in self.worker_mgr.workers:
+            return
+        self.worker_mgr.run(
+            'assign', self.reload_after_assign,
+            self.schedule_mgr.assign_services)
+
+    def reload_after_assign(self, result):
+        ''' Drop cached data and reload the screen with the new services.
+        Stages left without a free employee are reported with a warning '''
+
+        created, unassigned = result
+        clear_count_cache()
+        self.prefetch_mgr.invalidate()
+        if unassigned:
+            self.show_unassigned_message(created, unassigned)
+        else:
+            self.show_success_message()
+        self.reset_screen()
+
+    def open_analytics(self):
+        ''' Show the occupancy and revenue screen, kept between uses '''
+
+        if not self.analytics_controller:
+            self.analytics_controller = AnalyticsController(self)
+        self.analytics_controller.start()
+
     def reset_form_widgets(self):
         ''' Clear widgets except for id field '''
 
@@ -560,6 +883,7 @@ class ApartmentsController:
     def set_new_form(self):
         ''' Clear form widgets and show "new" in id field '''
 
+        self.new_form = True
         for widget in self.find_form_children():
             widget.clear_data()
         self.attachments_list.clear()
@@ -577,24 +901,83 @@ class ApartmentsController:
     def create_new_instance(self):
         ''' Create new record in database '''
 
-        with alch_session() as session:
+        instance = self.fill_with_widgets_data(self.act_model())
+        if not self.is_available(instance):
+            self.show_overlap_message()
+            return
+        with unit_of_work() as session:
             entity = Entity()
             session.add(entity)
-            session.commit()
-            instance = self.act_model()
+            session.flush()
             instance.entity_id = entity.id
-            instance = self.fill_with_widgets_data(instance)
             session.add(instance)
+            session.flush()
+            session.expunge(instance)  # Readable once the session is closed
+        clear_count_cache()
+        self.lookup_mgr.invalidate(self.act_model)
+        self.update_availability(instance)
         self.show_success_message()
-        self.reset_screen()
+        self.reset_screen(instance.id)
 
+    @try_function
     def edit_old_instance(self, edit_id):
         ''' Edit old record in database '''
 
-        old_instance = self.get_db_instance(edit_id)
-        self.fill_with_widgets_data(old_instance)
+        new_instance = self.fill_with_widgets_data(self.act_model())
+        if not self.is_available(new_instance, int(edit_id)):
+            self.show_overlap_message()
+            return
+        with unit_of_work() as session:
+            model = self.act_model
+            condition = (model.id == edit_id)
+            old_instance = session.query(model).filter(condition).first()
+            self.fill_with_widgets_data(old_instance)
+            session.flush()
+            session.expunge(old_instance)  # Readable once closed
+        self.instance_mgr.invalidate(self.act_model, edit_id)
+        self.lookup_mgr.invalidate(self.act_model)
+        self.update_availability(old_instance)
         self.show_success_message()
-        self.reset_screen()
+        self.reset_screen(old_instance.id)
+
+    def is_available(self, instance, ignore_id=None):
+        ''' Return if a reservation does not overlap another one of its
+        apartment. Other records are always available '''
+
+        if not isinstance(instance, Reservation):
+            return True
+        return self.availability_mgr.is_free(
+            instance.apartment_id, instance.checkin_date,
+            instance.checkout_date, ignore_id)
+
+    def load_availability(self):
+        ''' Index the reservations in background, so the first save does
+        not wait for it '''
+
+        manager = self.availability_mgr
+        if manager.apartments is None and (
+                'availability' not in self.worker_mgr.workers):
+            changes = manager.changes
+            self.worker_mgr.run(
+                'availability',
+                lambda result: self.set_availability(changes, result),
+                manager.load_index)
+
+    def set_availability(self, changes, result):
+        ''' Keep the loaded index, unless reservations changed meanwhile.
+        It is then loaded again on the next use '''
+
+        if self.availability_mgr.changes == changes:
+            self.availability_mgr.set_index(*result)
+
+    def update_availability(self, instance):
+        ''' Keep the availability index in sync with a saved record '''
+
+        if isinstance(instance, Reservation):
+            self.availability_mgr.add(instance)
+        elif isinstance(instance, Apartment):
+            self.availability_mgr.invalidate()
+        self.analytics_mgr.invalidate()
 
     def fill_with_widgets_data(self, instance):
         ''' Assign widget values to database instance '''
@@ -611,16 +994,19 @@ class ApartmentsController:
         ''' Return editable form widgets '''
 
         children = (xQLineEdit, xQTextEdit, xQComboBox, QAbstractSpinBox)
-        widgets = self.form.findChildren(children)
+        widgets = self.form_widgets.get(self.form_model, [])
+        widgets = [self.field_id, self.field_notes] + widgets
+        widgets = [x for x in widgets if isinstance(x, children)]
         return widgets
 
     def add_docs_to_db_and_list(self, files_paths):
         ''' Update attached docs in database and attachments list '''
 
-        act_id = int(self.act_table.selectedItems()[0].text())
+        act_id = self.act_table.get_selected_id()
         if files_paths and act_id:
             act_instance = self.get_db_instance(act_id)
             self.add_docs_to_db(act_instance, files_paths)
+            self.prefetch_mgr.invalidate()
             self.attachments_list.addItems(files_paths)
             self.show_success_message()
 
@@ -628,41 +1014,41 @@ class ApartmentsController:
     def add_docs_to_db(self, instance, paths):
         ''' Update attached docs in database '''
 
-        with alch_session() as session:
-            for path in paths:
-                document = Document()
-                document.foreign_entity_id = instance.entity_id
-                document.file_path = path
-                session.add(document)
+        with unit_of_work() as session:
+            session.bulk_insert_mappings(Document, [
+                {'foreign_entity_id': instance.entity_id, 'file_path': x}
+                for x in paths])
 
     def delete_docs_from_db_and_list(self):
         ''' Delete attached docs in database and attachments list '''
 
         selected_documents = self.attachments_list.selectedItems()
         documents_paths = [x.text() for x in selected_documents]
-        if documents_paths:
-            success = []
-            for document in self.get_act_instance_docs():
-                if document.file_path in documents_paths:
-                    done = self.delete_doc_from_db(document)
-                    success.append(done)
-            if success:  # Send only one success message for all documents
+        act_id = self.act_table.get_selected_id()
+        if documents_paths and act_id:
+            act_instance = self.get_db_instance(act_id)
+            if self.delete_docs_from_db(act_instance, documents_paths):
+                for item in selected_documents:
+                    self.attachments_list.takeItem(
+                        self.attachments_list.row(item))
+                self.prefetch_mgr.invalidate()
                 self.show_success_message()
-            self.reset_attachments_list()
 
     @try_function
-    def delete_doc_from_db(self, document):
-        ''' Delete the document from database '''
+    def delete_docs_from_db(self, instance, paths):
+        ''' Delete the documents of an instance in one statement '''
 
-        with alch_session() as session:
-            condition = (Document.id == document.id)
-            session.query(Document).filter(condition).delete()
+        with unit_of_work() as session:
+            condition = (Document.foreign_entity_id == instance.entity_id)
+            query = session.query(Document).filter(condition)
+            query = query.filter(Document.file_path.in_(paths))
+            query.delete(synchronize_session=False)
             return True
 
     def get_act_instance_docs(self):
         ''' Get active instance and its documents  '''
 
-        act_id = int(self.act_table.selectedItems()[0].text())
+        act_id = self.act_table.get_selected_id()
         act_instance = self.get_db_instance(act_id)
         documents = self.get_instance_docs(act_instance)
         return documents
@@ -671,7 +1057,7 @@ class ApartmentsController:
     def get_instance_docs(self, instance):
         ''' Get active instance from database '''
 
-        with alch_session() as session:
+        with read_session() as session:
             condition = (Document.foreign_entity_id == instance.entity_id)
             documents = session.query(Document).filter(condition).all()
             return documents
@@ -717,56 +1103,89 @@ class ApartmentsController:
         return command
 
     def print_top_data(self):
-        ''' Get top table data and call print dialog '''
+        ''' Get top table rows and call print dialog '''
 
-        if (data := self.top_data):
-            df = DataFrame(data=data, columns=data[0].keys())
-            self.open_print_dialog(df)
+        if self.top_data:
+            rows, total = self.get_top_export()
+            self.open_print_dialog(rows, self.top_query, total)
 
     def print_sub_data(self):
-        ''' Get sub table data and call print dialog '''
+        ''' Get sub table rows and call print dialog '''
 
         if (data := self.sub_data):
-            df = DataFrame(data=data, columns=data[0].keys())
-            self.open_print_dialog(df)
+            self.open_print_dialog(data, self.sub_query, len(data))
 
-    def open_print_dialog(self, df):
-        ''' Print data from Dataframe '''
+    def open_print_dialog(self, rows, query, total):
+        ''' Preview rows as table pages, to print them or save them as PDF '''
 
+        from PyQt5.QtPrintSupport import QPrintPreviewDialog, QPrinter
+        columns = [x['name'] for x in query.column_descriptions]
         dialog = QPrintPreviewDialog()
         self.theme_mgr.apply_theme(dialog)
-        editor = QTextEdit(self.view)
-        editor.setHtml(self.format_html(df.to_html()))
         printer = dialog.printer()
         printer.setOrientation(QPrinter.Landscape)
         printer.setPageSize(QPrinter.A4)
         printer.setDocName(EXPORTS_PATH + 'data.pdf')
-        dialog.paintRequested.connect(editor.print_)
+        dialog.paintRequested.connect(
+            lambda x: self.paint_pages(x, rows, columns, total))
+        pdf_action = dialog.findChild(QToolBar).addAction(
+            self.lang_mgr.translate('pdf_message'))
+        pdf_action.triggered.connect(dialog.reject)
+        pdf_action.triggered.connect(
+            lambda: self.open_pdf_dialog(rows, columns, total))
         if dialog.exec_() == QDialog.Accepted:
-            self.open_printer(editor, printer)
+            self.show_success_message()
 
     @try_function
-    def open_printer(self, editor, printer):
-        ''' Try to print the data selected '''
+    def paint_pages(self, printer, rows, columns, total):
+        ''' Paint the pages asked for. The preview keeps every page in
+        memory, so it only gets the first PRINT_PREVIEW_PAGES '''
 
-        editor.print_(printer)
-        self.show_success_message()
+        first_page, last_page = printer.fromPage() or 1, printer.toPage()
+        if printer.paintEngine().type() == QPaintEngine.Picture:
+            last_page = first_page + PRINT_PREVIEW_PAGES - 1
+        self.print_mgr.paint(
+            printer, rows, columns, total, first_page, last_page)
+
+    def open_pdf_dialog(self, rows, columns, total):
+        ''' Ask for the PDF file and write it in background '''
+
+        dialog = QFileDialog()
+        self.theme_mgr.apply_theme(dialog)
+        dialog.setWindowTitle(self.lang_mgr.translate('pdf_message'))
+        dialog.setDirectory(EXPORTS_PATH)
+        dialog.setOption(QFileDialog.DontUseNativeDialog)
+        dialog.setAcceptMode(QFileDialog.AcceptSave)
+        dialog.setDefaultSuffix('pdf')
+        dialog.selectFile('data.pdf')
+        if dialog.exec_():
+            path = dialog.selectedFiles()[0]
+            self.worker_mgr.run(
+                'print', lambda path: self.show_success_message(),
+                self.print_mgr.write_pdf, rows, columns, path, total)
 
     def export_top_data(self):
-        ''' Get top table data and call export dialog '''
+        ''' Get top table rows and call export dialog '''
 
-        if (data := self.top_data):
-            df = DataFrame(data=data, columns=data[0].keys())
-            self.open_export_dialog(df)
+        if self.top_data:
+            rows, total = self.get_top_export()
+            self.open_export_dialog(rows, self.top_query, total)
 
     def export_sub_data(self):
-        ''' Get sub table data and call export dialog '''
+        ''' Get sub table rows and call export dialog '''
 
         if (data := self.sub_data):
-            df = DataFrame(data=data, columns=data[0].keys())
-            self.open_export_dialog(df)
+            self.open_export_dialog(data, self.sub_query, len(data))
+
+    def get_top_export(self):
+        ''' Return the found top rows, or the query streaming all of them,
+        and their total '''
+
+        if self.top_search.text():
+            return self.top_data, len(self.top_data)
+        return self.top_query.order_by(self.top_model.id), self.top_count
 
-    def open_export_dialog(self, df):
+    def open_export_dialog(self, rows, query, total):
         ''' Open export dialog and call format documents '''
 
         dialog = QFileDialog()
@@ -777,26 +1196,24 @@ class ApartmentsController:
         dialog.setFileMode(QFileDialog.Directory)
         if dialog.exec_():
             folder = dialog.selectedFiles()[0]
-            self.export_to_formats(df, folder)
+            self.export_to_formats(rows, query, total, folder)
 
-    @try_function
-    def export_to_formats(self, df, folder):
-        ''' Try to export the documents to 3 different formats '''
-
-        html_text = self.format_html(df.to_html())
-        with open(f'{folder}/data.html', 'w') as file:
-            file.writelines(html_text)
-        df.to_csv(f'{folder}/data.csv')
-        df.to_json(f'{folder}/data.json')
-        self.show_success_message()
+    def export_to_formats(self, rows, query, total, folder):
+        ''' Export rows to CSV, JSON lines, HTML and, with pyarrow, to
+        Parquet and Feather in background '''
+
+        columns = [x['name'] for x in query.column_descriptions]
+        types = [x['type'] for x in query.column_descriptions]
+        self.worker_mgr.run(
+            'export', lambda paths: self.show_success_message(),
+            self.export_mgr.export, rows, columns, types, folder, total)
 
-    def format_html(self, text):
-        ''' Change the default html format '''
+    def show_progress(self, key, done, total):
+        ''' Show the percentage of exported or printed rows in the status bar '''
 
-        old_format = 'border="1"'
-        new_format = 'border="1" style="border-collapse:collapse"'
-        text = text.replace(old_format, new_format)
-        return text
+        percent = (100 * done // total) if total else 100
+        text = self.lang_mgr.translate(key)
+        self.view.statusBar().showMessage(f'{text} {min(percent, 100)}%')
 
     def show_confirmation_message(self):
         ''' Get translated message for confirmation and show dialog '''
@@ -831,6 +1248,17 @@ class ApartmentsController:
         msg.setStandardButtons(QMessageBox.Ok)
         msg.exec_()
 
+    def show_loading(self, busy):
+        ''' Show busy cursor and loading message while queries run '''
+
+        if busy:
+            QApplication.setOverrideCursor(Qt.BusyCursor)
+            text = self.lang_mgr.translate('loading_message')
+            self.view.statusBar().showMessage(text or '')
+        else:
+            QApplication.restoreOverrideCursor()
+            self.view.statusBar().clearMessage()
+
     def show_not_found_message(self):
         ''' Get translated message for not_found and show dialog '''
 
@@ -842,6 +1270,31 @@ class ApartmentsController:
         msg.setStandardButtons(QMessageBox.Ok)
         msg.exec_()
 
+    def show_overlap_message(self):
+        ''' Get translated message for overlapping reservations and show
+        dialog '''
+
+        msg = QMessageBox()
+        self.theme_mgr.apply_theme(msg)
+        msg.setWindowTitle(self.lang_mgr.translate('error_title'))
+        msg.setText(self.lang_mgr.translate('overlap_message'))
+        msg.setIcon(QMessageBox.Warning)
+        msg.setStandardButtons(QMessageBox.Ok)
+        msg.exec_()
+
+    def show_unassigned_message(self, created, unassigned):
+        ''' Get translated message for services created and stages without
+        a free employee and show dialog '''
+
+        msg = QMessageBox()
+        self.theme_mgr.apply_theme(msg)
+        msg.setWindowTitle(self.lang_mgr.translate('error_title'))
+        msg.setText(self.lang_mgr.translate('unassigned_message').format(
+            created=created, unassigned=unassigned))
+        msg.setIcon(QMessageBox.Warning)
+        msg.setStandardButtons(QMessageBox.Ok)
+        msg.exec_()
+
     def show_help_message(self):
         ''' Get translated message for help and show dialog '''
 
@@ -878,10 +1331,15 @@ class ApartmentsController:
 
         self.act_lang = language
         self.lang_mgr.change_language(language)
-        for widget in self.view.findChildren((QPushButton, QLabel)):
-            widget.setText(self.lang_mgr.translate(widget.objectName()))
-        for action in self.menubar.findChildren(QAction):
-            action.setText(self.lang_mgr.translate(action.data()))
+        widgets = self.view.findChildren((QPushButton, QLabel))
+        texts = self.lang_mgr.translate_many(x.objectName() for x in widgets)
+        for widget, text in zip(widgets, texts):
+            widget.setText(text)
+        actions = self.menubar.findChildren(QAction)
+        texts = self.lang_mgr.translate_many(x.data() for x in actions)
+        for action, text in zip(actions, texts):
+            action.setText(text)
+        self.form_model = None  # Rename form labels in the new language
         self.reset_screen()
 
     def start(self):
@@ -895,7 +1353,17 @@ class ApartmentsController:
 
 
 if __name__ == '__main__':
+    startup_mgr = StartupManager(START_TIME)
+    startup_mgr.mark('imports')
     app = QApplication(sys.argv)
+    startup_mgr.mark('application')
+    loop = install_qt_loop(app) if ASYNC_DB else None
     controller = ApartmentsController(app)
+    startup_mgr.mark('controller')
+    if '--profile-startup' in sys.argv:
+        startup_mgr.watch(controller.view)  # Report and quit once painted
     controller.start()
-    sys.exit(app.exec_())
+    if loop is None:
+        sys.exit(app.exec_())
+    with loop:
+        loop.run_forever()
@@ -1,21 +1,18 @@
-import PyQt5
-from PyQt5.Qt import *
 from PyQt5.QtGui import *
 from PyQt5.QtCore import *
 from PyQt5.QtWidgets import *
-from PyQt5 import Qt, QtGui, QtCore, QtWidgets, uic
-from common.connections.alchemy_cn import main_engine, alch_session
+from PyQt5 import QtGui, QtCore, QtWidgets, uic
+from common.connections.alchemy_cn import read_session, unit_of_work
 from apps.apartments.models.apartments_mdl import *
 from common.data.constants import CITY_FORM_VIEW_PATH
-from common.managers.language_mgr import LangManager
-import pandas as pd
+from common.managers.language_mgr import get_lang_manager
 
 
 class CityFormController:
     def __init__(self, app_controller):
         self.view = uic.loadUi(CITY_FORM_VIEW_PATH, QMainWindow())
         self.app_controller = app_controller
-        self.lang_manager = LangManager()
+        self.lang_manager = get_lang_manager()
 
         self.view.country_cbx.currentTextChanged.connect(self.load_city_combo)
         self.view.city_cbx.currentTextChanged.connect(self.write_editline)
@@ -37,9 +34,10 @@ class CityFormController:
     def delete_record(self):
         city_id = self.view.city_cbx.currentData()
         try:
-            with alch_session() as session:
+            with unit_of_work() as session:
                 condition = (City.id == city_id)
                 session.query(City).filter(condition).delete()
+            self.app_controller.invalidate_caches()
             self.view.name_edit.setText('')
             self.show_success_message()
         except Exception as exc:
@@ -50,7 +48,7 @@ class CityFormController:
 
     def save_record(self):
         try:
-            with alch_session() as session:
+            with unit_of_work() as session:
                 if self.view.city_cbx.currentData() == '$#':
                     city = City()
                 else:
@@ -61,6 +59,8 @@ class CityFormController:
                 city.country_id = self.view.country_cbx.currentData()
                 session.add(city)
                 self.show_success_message()
+            self.app_controller.lookup_mgr.invalidate(City)
+            self.app_controller.instance_mgr.invalidate(City)
         except Exception as exc:
             self.show_error_message()
             print(exc)
@@ -89,22 +89,21 @@ class CityFormController:
 
     def load_country_combo(self):
         self.view.country_cbx.clear()
-        countries = pd.read_sql('country', main_engine)
+        with read_session() as session:
+            query = session.query(Country.id, Country.country_name)
+            countries = query.all()
 
-        for country_data in countries.itertuples():
-            country_id = country_data[1]
-            country_name = country_data[2]
+        for country_id, country_name in countries:
             self.view.country_cbx.addItem(country_name, country_id)
 
     def load_city_combo(self):
         self.view.city_cbx.clear()
         country_id = self.view.country_cbx.currentData()
-        cities = pd.read_sql('city', main_engine)
-        cities = cities[cities['country_id']==country_id]
-        
-        for city_data in cities.itertuples():
-            city_id = city_data[1]
-            city_name = city_data[2]
+        with read_session() as session:
+            query = session.query(City.id, City.city_name)
+            cities = query.filter(City.country_id == country_id).all()
+
+        for city_id, city_name in cities:
             self.view.city_cbx.addItem(city_name, city_id)
 
     def translate_screen(self, lang):
@@ -1,13 +1,10 @@
-import PyQt5
-from PyQt5.Qt import *
 from PyQt5.QtGui import *
 from PyQt5.QtCore import *
 from PyQt5.QtWidgets import *
-from PyQt5 import Qt, QtGui, QtCore, QtWidgets, uic
-from common.connections.alchemy_cn import main_engine, alch_session
+from PyQt5 import QtGui, QtCore, QtWidgets, uic
+from common.connections.alchemy_cn import read_session, unit_of_work
 from common.data.constants import FORM_VIEW_PATH
-from common.managers.language_mgr import LangManager
-import pandas as pd
+from common.managers.language_mgr import get_lang_manager
 
 
 class FormController:
@@ -17,7 +14,7 @@ class FormController:
         self.model = model
         self.table_name = table_name
         self.app_controller = app_controller
-        self.lang_manager = LangManager()
+        self.lang_manager = get_lang_manager()
         self.combobox = self.view.findChildren(QComboBox)[0]
         self.name_attr = [
             x for x in dir(model) if 'name' in x and (x != '__tablename__')][0]
@@ -41,9 +38,10 @@ class FormController:
     def delete_record(self):
         instance_id = self.combobox.currentData()
         try:
-            with alch_session() as session:
+            with unit_of_work() as session:
                 condition = (self.model.id == instance_id)
                 session.query(self.model).filter(condition).delete()
+            self.app_controller.invalidate_caches()
             self.view.name_edit.setText('')
             self.show_success_message()
         except Exception as exc:
@@ -54,7 +52,7 @@ class FormController:
 
     def save_record(self):
         try:
-            with alch_session() as session:
+            with unit_of_work() as session:
                 if self.combobox.currentData() == '$#':
                     instance = self.model()
                 else:
@@ -64,6 +62,8 @@ class FormController:
                 setattr(instance, self.name_attr, self.view.name_edit.text())
                 session.add(instance)
                 self.show_success_message()
+            self.app_controller.lookup_mgr.invalidate(self.model)
+            self.app_controller.instance_mgr.invalidate(self.model)
         except Exception as exc:
             self.show_error_message()
             print(exc)
@@ -88,11 +88,11 @@ class FormController:
 
     def load_combo(self):
         self.combobox.clear()
-        records = pd.read_sql(self.table_name, main_engine)
+        with read_session() as session:
+            name = getattr(self.model, self.name_attr)
+            records = session.query(self.model.id, name).all()
 
-        for record_data in records.itertuples():
-            record_id = record_data[1]
-            record_name = record_data[2]
+        for record_id, record_name in records:
             self.combobox.addItem(record_name, record_id)
 
     def translate_screen(self, lang):
@@ -2,16 +2,14 @@ from abc import ABC, ABCMeta, abstractmethod
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, backref
 from sqlalchemy import Column, Integer, SmallInteger, String, Text
-from sqlalchemy import Date, Time, Float, ForeignKey
+from sqlalchemy import Date, Time, Float, ForeignKey, Index, func, cast
 from datetime import date, time
-from PyQt5.Qt import *
 from PyQt5.QtGui import *
 from PyQt5.QtCore import *
 from PyQt5.QtWidgets import *
-from PyQt5 import Qt
 from PyQt5.QtCore import Qt, QUrl
 from PyQt5.QtWidgets import QAbstractItemView as qa
-from common.data.constants import DB_NAME
+from common.data.constants import DB_NAME, TABLE_BATCH_SIZE
 
 
 # ============ EXTENDED WIDGETS ============
@@ -36,6 +34,7 @@ class xQComboBox(QComboBox):
     def __init__(self):
         super().__init__()
         self.field = None
+        self.lookups = None
 
     def clear_data(self):
         self.setCurrentIndex(self.findData('$#'))
@@ -135,8 +134,8 @@ class xQCountryComboBox(xQComboBox):
     def get_model(self):
         return Country
 
-    def get_text(self, instance):
-        return instance.country_name
+    def get_column(self):
+        return Country.country_name
 
 
 class xQCityComboBox(xQComboBox):
@@ -146,8 +145,8 @@ class xQCityComboBox(xQComboBox):
     def get_model(self):
         return City
 
-    def get_text(self, instance):
-        return instance.city_name
+    def get_column(self):
+        return City.city_name
 
 
 class xQReservationComboBox(xQComboBox):
@@ -157,8 +156,8 @@ class xQReservationComboBox(xQComboBox):
     def get_model(self):
         return Reservation
 
-    def get_text(self, instance):
-        return str(instance.id)
+    def get_column(self):
+        return cast(Reservation.id, String)
 
 
 class xQCustomerComboBox(xQComboBox):
@@ -168,8 +167,8 @@ class xQCustomerComboBox(xQComboBox):
     def get_model(self):
         return Customer
 
-    def get_text(self, instance):
-        return f'{instance.first_name} {instance.last_name}'
+    def get_column(self):
+        return func.concat(Customer.first_name, ' ', Customer.last_name)
 
 
 class xQEmployeeComboBox(xQComboBox):
@@ -179,8 +178,8 @@ class xQEmployeeComboBox(xQComboBox):
     def get_model(self):
         return Employee
 
-    def get_text(self, instance):
-        return f'{instance.first_name} {instance.last_name}'
+    def get_column(self):
+        return func.concat(Employee.first_name, ' ', Employee.last_name)
 
 
 class xQAgencyComboBox(xQComboBox):
@@ -190,8 +189,8 @@ class xQAgencyComboBox(xQComboBox):
     def get_model(self):
         return Agency
 
-    def get_text(self, instance):
-        return instance.agency_name
+    def get_column(self):
+        return Agency.agency_name
 
 
 class xQOwnerComboBox(xQComboBox):
@@ -201,8 +200,8 @@ class xQOwnerComboBox(xQComboBox):
     def get_model(self):
         return Owner
 
-    def get_text(self, instance):
-        return f'{instance.first_name} {instance.last_name}'
+    def get_column(self):
+        return func.concat(Owner.first_name, ' ', Owner.last_name)
 
 
 class xQApartmentComboBox(xQComboBox):
@@ -212,8 +211,8 @@ class xQApartmentComboBox(xQComboBox):
     def get_model(self):
         return Apartment
 
-    def get_text(self, instance):
-        return instance.apartment_name
+    def get_column(self):
+        return Apartment.apartment_name
 
 
 class xQServiceTypeComboBox(xQComboBox):
@@ -223,8 +222,8 @@ class xQServiceTypeComboBox(xQComboBox):
     def get_model(self):
         return ServiceType
 
-    def get_text(self, instance):
-        return instance.s_type_name
+    def get_column(self):
+        return ServiceType.s_type_name
 
 
 class xQServiceCategoryComboBox(xQComboBox):
@@ -234,8 +233,8 @@ class xQServiceCategoryComboBox(xQComboBox):
     def get_model(self):
         return ServiceCategory
 
-    def get_text(self, instance):
-        return instance.s_category_name
+    def get_column(self):
+        return ServiceCategory.s_category_name
 
 
 class xQEmployeeCategoryComboBox(xQComboBox):
@@ -245,8 +244,8 @@ class xQEmployeeCategoryComboBox(xQComboBox):
     def get_model(self):
         return EmployeeCategory
 
-    def get_text(self, instance):
-        return instance.e_category_name
+    def get_column(self):
+        return EmployeeCategory.e_category_name
 
 
 class xQListWidget(QListWidget):
@@ -283,15 +282,87 @@ class xQListWidget(QListWidget):
             event.ignore()
 
 
-class xQTableWidget(QTableWidget):
+class xQTableModel(QAbstractTableModel):
+    ''' Read-only model over query rows, exposed to the view in batches '''
+
+    def __init__(
+            self, rows, headers, fetch=None, batch_size=TABLE_BATCH_SIZE):
+        super().__init__()
+        self.rows = rows
+        self.headers = headers
+        self.fetch = fetch
+        self.batch_size = batch_size
+        self.loaded = min(len(rows), batch_size)
+        self.sort_order = None  # Column and order of the last sort
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return str(self.rows[index.row()][index.column()])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self.loaded < len(self.rows) or self.fetch is not None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if self.loaded == len(self.rows):
+            if not (rows := self.fetch()):
+                self.fetch = None
+                return
+            self.rows.extend(rows)
+        else:
+            rows = None
+        amount = min(len(self.rows) - self.loaded, self.batch_size)
+        first, last = self.loaded, self.loaded + amount - 1
+        self.beginInsertRows(QModelIndex(), first, last)
+        self.loaded += amount
+        self.endInsertRows()
+        if rows and self.sort_order:
+            self.sort(*self.sort_order)  # Pages come by id, not sorted
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sort_order = (column, order)
+        self.layoutAboutToBeChanged.emit()
+        criteria = lambda x: (x[column] is None, x[column])
+        reverse = (order == Qt.DescendingOrder)
+        self.rows.sort(key=criteria, reverse=reverse)
+        self.layoutChanged.emit()
+
+    def get_row_id(self, row):
+        return int(self.rows[row][0])
+
+
+class xQTableView(QTableView):
     def __init__(self):
         self.verticalHeader().setVisible(False)
+        self.verticalHeader().setDefaultSectionSize(10)
         self.setAlternatingRowColors(True)
         self.setEditTriggers(qa.NoEditTriggers)
         self.setSelectionMode(qa.SingleSelection)
         self.setSelectionBehavior(qa.SelectRows)
         self.setSortingEnabled(True)
 
+    def load_data(self, rows, headers, fetch=None):
+        selection = self.selectionModel()
+        self.table_model = xQTableModel(rows, headers, fetch)
+        self.setModel(self.table_model)
+        if selection:
+            selection.deleteLater()
+
+    def get_selected_id(self):
+        if self.model() and (rows := self.selectionModel().selectedRows()):
+            return self.model().get_row_id(rows[0].row())
+
 
 class xQIdLineEdit(xQLineEdit):
     def __init__(self):
@@ -416,7 +487,9 @@ class Entity(Base):
 
 class Document(Base):
     __tablename__ = 'document'
-    __table_args__ = {'schema': DB_NAME}
+    __table_args__ = (
+        Index('ix_document_foreign_entity', 'foreign_entity_id'),
+        {'schema': DB_NAME})
 
     id = Column(Integer, primary_key=True)
     foreign_entity_id = Column(
@@ -578,7 +651,9 @@ class Agency(Base, Contact, Address, metaclass=HibridMeta):
 
 class Apartment(Base, Address, metaclass=HibridMeta):
     __tablename__ = 'apartment'
-    __table_args__ = {'schema': DB_NAME}
+    __table_args__ = (
+        Index('ix_apartment_owner', 'owner_id'),
+        {'schema': DB_NAME})
 
     id = Column(Integer, primary_key=True)
     entity_id = Column(
@@ -675,7 +750,14 @@ class Employee(Base, Person, metaclass=HibridMeta):
 
 class Reservation(Base):
     __tablename__ = 'reservation'
-    __table_args__ = {'schema': DB_NAME}
+    __table_args__ = (
+        Index('ix_reservation_apartment_checkin',
+              'apartment_id', 'checkin_date'),
+        Index('ix_reservation_customer_checkin',
+              'customer_id', 'checkin_date'),
+        Index('ix_reservation_agency_checkin',
+              'agency_id', 'checkin_date'),
+        {'schema': DB_NAME})
 
     id = Column(Integer, primary_key=True)
     entity_id = Column(
@@ -745,7 +827,10 @@ class ServiceCategory(Base):
 
 class Service(Base):
     __tablename__ = 'service'
-    __table_args__ = {'schema': DB_NAME}
+    __table_args__ = (
+        Index('ix_service_reservation_date', 'reservation_id', 'date'),
+        Index('ix_service_employee_date', 'employee_id', 'date'),
+        {'schema': DB_NAME})
 
     id = Column(Integer, primary_key=True)
     entity_id = Column(
@@ -2,21 +2,33 @@ from apps.apartments.models.apartments_mdl import *
 from common.connections.alchemy_cn import main_engine, alch_session
 
 
-Base.metadata.drop_all(main_engine)
-Base.metadata.create_all(main_engine)
+CATEGORIES = (
+    (EmployeeCategory, 'e_category_name', ('Host', 'Cleaner')),
+    (ServiceType, 's_type_name',
+     ('Day-time', 'Night-time', 'Weekend', 'Holiday')),
+    (ServiceCategory, 's_category_name',
+     ('Check-in', 'Check-out', 'Cleaning', 'Extra')))
 
-with alch_session() as session:
-    for stg in ('Host', 'Cleaner'):
-        instance = EmployeeCategory(e_category_name=stg)
-        session.add(instance)
 
-    for stg in ('Day-time', 'Night-time', 'Weekend', 'Holiday'):
-        instance = ServiceType(s_type_name=stg)
-        session.add(instance)
+def create_tables(engine):
+    ''' Drop and create every table '''
 
-    for stg in ('Check-in', 'Check-out', 'Cleaning', 'Extra'):
-        instance = ServiceCategory(s_category_name=stg)
-        session.add(instance)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
 
-for table in Base.metadata.sorted_tables:
-    print(f'{table.schema}: {table.name}')
+
+def add_categories(session):
+    ''' Add the fixed categories, the demo data relies on their ids '''
+
+    for model, column, names in CATEGORIES:
+        for instance_id, name in enumerate(names, 1):
+            session.add(model(id=instance_id, **{column: name}))
+
+
+if __name__ == '__main__':
+    create_tables(main_engine)
+    with alch_session() as session:
+        add_categories(session)
+
+    for table in Base.metadata.sorted_tables:
+        print(f'{table.schema}: {table.name}')
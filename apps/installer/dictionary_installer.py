@@ -0,0 +1,9 @@
+from common.managers.language_mgr import LangManager
+from common.data.constants import DICTIONARY_BUNDLE_PATH
+
+
+# Compile the dictionary database into the bundle read at startup
+dictionaries = LangManager.compile_bundle()
+for language, dictionary in dictionaries.items():
+    print(f'{language}: {len(dictionary)} texts')
+print(f'Bundle written to {DICTIONARY_BUNDLE_PATH}')
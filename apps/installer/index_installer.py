@@ -0,0 +1,9 @@
+from apps.apartments.models.apartments_mdl import *
+from common.connections.alchemy_cn import main_engine
+
+
+# Add the secondary indexes declared in the models to an existing database
+for table in Base.metadata.sorted_tables:
+    for index in table.indexes:
+        index.create(main_engine, checkfirst=True)
+        print(f'{table.schema}: {table.name}: {index.name}')
@@ -0,0 +1,226 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import platform
+from math import ceil, sqrt
+from statistics import median
+from contextlib import redirect_stdout
+from timeit import default_timer as timer
+
+
+SIZES = (10_000, 100_000, 1_000_000)
+RUNS = 5
+RESERVATIONS_PER_SCALE = 35  # DemoInstaller writes about 35 * scale² rows
+SCREENS = (
+    'reservation', 'service', 'customer', 'employee', 'agency', 'owner',
+    'apartment')
+SEARCH_TEXT = '2020-03'  # Typed one keystroke at a time
+REGRESSION_RATIO = 1.25  # Slowdown against the baseline that fails
+DATA_PATH = os.path.join(tempfile.gettempdir(), 'apartments_bench')
+WORK_DB = os.path.join(DATA_PATH, 'work.db')
+
+
+def set_environment():
+    ''' Point the application to the SQLite work file before importing it '''
+
+    os.makedirs(DATA_PATH, exist_ok=True)
+    os.environ['DB_URL'] = f'sqlite:///{WORK_DB}'
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    os.environ.setdefault('DB_NAME', 'apartments')
+    for name in ('DB_DRIVER', 'DB_USER', 'DB_PASSWORD', 'DB_HOST', 'DB_PORT'):
+        os.environ.setdefault(name, '')
+
+
+def get_seed_path(size):
+    return os.path.join(DATA_PATH, f'seed_{size}.db')
+
+
+def close_connections():
+    ''' Release every connection to the work file so it can be replaced '''
+
+    from common.connections.alchemy_cn import get_engine, thread_sessions
+    from common.connections.alchemy_cn import clear_count_cache
+    thread_sessions.remove()
+    get_engine().dispose()
+    clear_count_cache()
+
+
+def seed_database(size):
+    ''' Fill a new work file with the demo installer, keeping a copy '''
+
+    from common.connections.alchemy_cn import get_engine, unit_of_work
+    from apps.installer.db_installer import create_tables, add_categories
+    from apps.installer.demo_installer import DemoInstaller
+
+    close_connections()
+    if os.path.exists(WORK_DB):
+        os.remove(WORK_DB)
+    start = timer()
+    create_tables(get_engine())
+    with unit_of_work() as session:
+        add_categories(session)
+    with redirect_stdout(sys.stderr):  # Keep stdout for the results
+        DemoInstaller(ceil(sqrt(size / RESERVATIONS_PER_SCALE)))
+    close_connections()
+    shutil.copy(WORK_DB, get_seed_path(size))
+    return timer() - start
+
+
+def load_database(size, reseed):
+    ''' Copy the seeded file of a size to the work file, seeding it once '''
+
+    if reseed or not os.path.exists(get_seed_path(size)):
+        return seed_database(size)
+    close_connections()
+    shutil.copy(get_seed_path(size), WORK_DB)
+    return None
+
+
+def measure(ctr, function, runs):
+    ''' Time function until every background request it started is done '''
+
+    times = []
+    for _ in range(runs):
+        start = timer()
+        function()
+        ctr.worker_mgr.wait_for_done()
+        times.append((timer() - start) * 1000)
+    return {
+        'median_ms': round(median(times), 3), 'max_ms': round(max(times), 3),
+        'runs': runs}
+
+
+def type_search(ctr, text):
+    ''' Run the top search once per keystroke, skipping the debounce '''
+
+    for i in range(1, len(text) + 1):
+        ctr.top_search.blockSignals(True)
+        ctr.top_search.setText(text[:i])
+        ctr.top_search.blockSignals(False)
+        ctr.search_top_table()
+        ctr.worker_mgr.wait_for_done()
+
+
+def export_top_data(ctr, folder):
+    ''' Export every top row as the export dialog does '''
+
+    rows, total = ctr.get_top_export()
+    ctr.export_to_formats(rows, ctr.top_query, total, folder)
+
+
+def fail(message):
+    raise RuntimeError(message)
+
+
+def bench_screens(app, runs):
+    ''' Time every interaction against the current work file '''
+
+    from apps.apartments.controllers.apartments_ctr import ApartmentsController
+    from common.connections.alchemy_cn import alch_session, Reservation
+
+    results = {}
+    start = timer()
+    ctr = ApartmentsController(app)
+    ctr.worker_mgr.wait_for_done()
+    results['controller_init'] = {
+        'median_ms': round((timer() - start) * 1000, 3), 'runs': 1}
+
+    # Dialogs would block a headless run, and errors must not pass silently
+    ctr.show_success_message = lambda: None
+    ctr.show_confirmation_message = lambda: True
+    ctr.show_error_message = lambda: fail('the application showed an error')
+
+    for screen in SCREENS:
+        change_screen = getattr(ctr, f'change_{screen}')
+        results[f'screen_{screen}'] = measure(ctr, change_screen, runs)
+
+    ctr.change_reservation()
+    ctr.worker_mgr.wait_for_done()
+    steps = runs * 10
+    results['navigate_top'] = measure(ctr, lambda: ctr.navigate_top(1), steps)
+    results['navigate_sub'] = measure(ctr, lambda: ctr.navigate_sub(1), steps)
+
+    search = lambda: type_search(ctr, SEARCH_TEXT)
+    results['search_text'] = measure(ctr, search, runs)
+    results['search_text']['keystrokes'] = len(SEARCH_TEXT)
+    ctr.reset_screen()
+    ctr.worker_mgr.wait_for_done()
+
+    ctr.navigate_top()
+    ctr.worker_mgr.wait_for_done()
+    results['save'] = measure(ctr, ctr.save_instance, runs)
+    results['delete'] = measure(ctr, ctr.delete_top_row, runs)
+
+    with tempfile.TemporaryDirectory() as folder:
+        export = lambda: export_top_data(ctr, folder)
+        results['export_top'] = measure(ctr, export, 1)
+
+    with alch_session() as session:
+        reservations = session.query(Reservation).count()
+    ctr.view.close()
+    return reservations, results
+
+
+def compare(results, baseline):
+    ''' Return the operations slower than the baseline allows '''
+
+    slower = []
+    for size, result in results['sizes'].items():
+        old = baseline['sizes'].get(size, {}).get('operations', {})
+        for name, timing in result['operations'].items():
+            if name in old and old[name]['median_ms'] > 0:
+                ratio = timing['median_ms'] / old[name]['median_ms']
+                if ratio > REGRESSION_RATIO:
+                    slower.append(f'{size} {name}: x{ratio:.2f}')
+    return slower
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Time every screen against seeded SQLite databases')
+    parser.add_argument(
+        'sizes', type=int, nargs='*', default=SIZES,
+        help='approximate reservations of each database')
+    parser.add_argument('--runs', type=int, default=RUNS)
+    parser.add_argument('--output', help='write the JSON results to a file')
+    parser.add_argument('--baseline', help='fail on regressions against it')
+    parser.add_argument(
+        '--reseed', action='store_true', help='seed the databases again')
+    args = parser.parse_args()
+
+    set_environment()
+    from PyQt5.QtWidgets import QApplication
+    import sqlalchemy
+    app = QApplication(sys.argv[:1])
+
+    results = {
+        'python': platform.python_version(),
+        'sqlalchemy': sqlalchemy.__version__, 'backend': 'sqlite',
+        'sizes': {}}
+    for size in args.sizes:
+        seed_time = load_database(size, args.reseed)
+        reservations, operations = bench_screens(app, args.runs)
+        results['sizes'][str(size)] = {
+            'reservations': reservations,
+            'seed_s': seed_time and round(seed_time, 1),
+            'operations': operations}
+        print(f'{size}: {reservations} reservations', file=sys.stderr)
+        for name, timing in operations.items():
+            print(f'{name:>20} {timing["median_ms"]:>12.1f} ms',
+                  file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            if (slower := compare(results, json.load(file))):
+                sys.exit('FAIL: slower than the baseline\n' + '\n'.join(slower))
+        print('OK', file=sys.stderr)
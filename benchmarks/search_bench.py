@@ -0,0 +1,82 @@
+import sys
+import random as rd
+from datetime import date, timedelta
+from timeit import default_timer as timer
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication, QTableWidget, QTableWidgetItem
+from common.managers.index_mgr import IndexManager
+
+
+SIZES = (10_000, 100_000, 1_000_000)
+SEARCHES = ('smith', 'sea view', '2021-03', 'lorem', '12')
+NAMES = ('Rosie', 'Pierre', 'Ana', 'Luis', 'Marie', 'John', 'Elena')
+SURNAMES = ('Smith', 'Dupont', 'Ruiz', 'Galvan', 'Martin', 'Rossi')
+AGENCIES = ('Booking', 'Airbnb', 'Expedia', 'Direct', 'Homeaway')
+APARTMENTS = ('Sea View', 'Old Town', 'Sea Breeze', 'Harbour', 'Plaza')
+
+
+def get_rows(size):
+    ''' Build reservation-like rows shaped as res_top_query output '''
+
+    rows = []
+    start = date(2020, 1, 1)
+    for row_id in range(1, size + 1):
+        checkin = start + timedelta(rd.randint(0, 1500))
+        checkout = checkin + timedelta(rd.randint(2, 7))
+        amount = round(rd.uniform(80, 600), 2)
+        rows.append((
+            row_id, f'{rd.choice(NAMES)} {rd.choice(SURNAMES)}',
+            rd.choice(AGENCIES), rd.choice(APARTMENTS), checkin, checkout,
+            rd.randint(1, 8), amount, 2.0, round(amount / 3, 2),
+            'Lorem ipsum dolor sit amet'))
+    return rows
+
+
+def bench_find_items(rows):
+    ''' Time the QTableWidget build and findItems search '''
+
+    start = timer()
+    table = QTableWidget(len(rows), len(rows[0]))
+    for r, row in enumerate(rows):
+        for c, column in enumerate(row):
+            table.setItem(r, c, QTableWidgetItem(str(column)))
+    build = timer() - start
+
+    searches = []
+    for text in SEARCHES:
+        start = timer()
+        items = table.findItems(text, Qt.MatchContains)
+        {int(table.item(x.row(), 0).text()) for x in items}
+        searches.append(timer() - start)
+    table.setRowCount(0)
+    return build, searches
+
+
+def bench_index(rows):
+    ''' Time the trigram index build and search '''
+
+    index = IndexManager()
+    start = timer()
+    index.build(rows)
+    build = timer() - start
+
+    searches = []
+    for text in SEARCHES:
+        start = timer()
+        index.search(text)
+        searches.append(timer() - start)
+    return build, searches
+
+
+if __name__ == '__main__':
+    app = QApplication(sys.argv[:1])
+    sizes = [int(x) for x in sys.argv[1:]] or SIZES
+    header = ''.join(f'{repr(x):>12}' for x in SEARCHES)
+    print(f'{"rows":>10} {"path":>10} {"build (s)":>10}{header}  (ms)')
+    for size in sizes:
+        rows = get_rows(size)
+        for name, function in (('findItems', bench_find_items),
+                               ('index', bench_index)):
+            build, searches = function(rows)
+            searches = ''.join(f'{x * 1000:>12.3f}' for x in searches)
+            print(f'{size:>10} {name:>10} {build:>10.2f}{searches}')
@@ -0,0 +1,58 @@
+import re
+import sys
+import json
+import subprocess
+from statistics import median
+from timeit import default_timer as timer
+
+
+ENTRY_POINT = 'apps/apartments/controllers/apartments_ctr.py'
+RUNS = 5
+STARTUP_BUDGET_MS = 1500  # Median time to first paint allowed
+IMPORTS_SHOWN = 15
+
+
+def run_startup(*options):
+    ''' Start the application in a new process until its first paint '''
+
+    command = [sys.executable, *options, ENTRY_POINT, '--profile-startup']
+    start = timer()
+    process = subprocess.run(command, capture_output=True, text=True)
+    wall = (timer() - start) * 1000
+    if process.returncode:
+        sys.exit(process.stderr)
+    report = json.loads(process.stdout[process.stdout.index('{'):])
+    return wall, report, process.stderr
+
+
+def get_import_times(stderr):
+    ''' Return the slowest modules of a -X importtime output '''
+
+    pattern = r'import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)'
+    times = [(int(x), len(y), z) for x, y, z in re.findall(pattern, stderr)]
+    times = [(x, z) for x, y, z in times if y <= 2]  # Top level imports
+    return sorted(times, reverse=True)[:IMPORTS_SHOWN]
+
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else RUNS
+    results = [run_startup() for _ in range(runs)]
+    walls = [x[0] for x in results]
+    totals = [x[1]['total_ms'] for x in results]
+    loaded = results[-1][1]['deferred_modules_loaded']
+
+    _, _, stderr = run_startup('-X', 'importtime')
+    print(f'{"cumulative (ms)":>16}  module')
+    for microseconds, module in get_import_times(stderr):
+        print(f'{microseconds / 1000:>16.1f}  {module}')
+
+    print(json.dumps(results[-1][1]['phases_ms']))
+    print(f'process wall time median: {median(walls):.1f} ms')
+    print(f'time to first paint median: {median(totals):.1f} ms '
+          f'(budget {STARTUP_BUDGET_MS} ms)')
+
+    if loaded:
+        sys.exit(f'FAIL: deferred modules imported at startup: {loaded}')
+    if median(totals) > STARTUP_BUDGET_MS:
+        sys.exit('FAIL: cold start exceeds the startup budget')
+    print('OK')
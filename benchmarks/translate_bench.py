@@ -0,0 +1,60 @@
+import sys
+import pandas as pd
+from sqlalchemy import create_engine
+from timeit import default_timer as timer
+from common.data.constants import DICTIONARY_PATH
+from common.managers.language_mgr import LangManager
+
+
+LANGUAGE = 'spanish'
+ROUNDS = 100
+
+
+def bench_pandas(words, rounds):
+    ''' Time the previous boolean mask lookup over a pandas dataframe '''
+
+    df = pd.read_sql('dictionary', create_engine(DICTIONARY_PATH))
+    start = timer()
+    for _ in range(rounds):
+        for word in words:
+            try:
+                df[df['text']==word][LANGUAGE].values[0]
+            except:
+                pass
+    return timer() - start
+
+
+def bench_dict(words, rounds):
+    ''' Time the per language dict lookup '''
+
+    lang_mgr = LangManager()
+    lang_mgr.change_language(LANGUAGE)
+    start = timer()
+    for _ in range(rounds):
+        for word in words:
+            lang_mgr.translate(word)
+    return timer() - start
+
+
+def bench_dict_many(words, rounds):
+    ''' Time the bulk dict lookup '''
+
+    lang_mgr = LangManager()
+    lang_mgr.change_language(LANGUAGE)
+    start = timer()
+    for _ in range(rounds):
+        lang_mgr.translate_many(words)
+    return timer() - start
+
+
+if __name__ == '__main__':
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else ROUNDS
+    words = list(LangManager().get_dictionaries()[LANGUAGE])
+    words.append('missing_word')
+    lookups = len(words) * rounds
+    print(f'{lookups} lookups over {len(words)} words')
+    print(f'{"path":>14} {"total (s)":>10} {"per lookup (us)":>16}')
+    for name, function in (('pandas', bench_pandas), ('dict', bench_dict),
+                           ('translate_many', bench_dict_many)):
+        total = function(words, rounds)
+        print(f'{name:>14} {total:>10.4f} {total / lookups * 1e6:>16.3f}')
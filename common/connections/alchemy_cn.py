@@ -1,121 +1,205 @@
 from contextlib import contextmanager
+from functools import lru_cache
 from apps.apartments.models.apartments_mdl import *
-from sqlalchemy import create_engine, func
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event, func, cast, or_, String
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Query, sessionmaker, scoped_session
 from sqlalchemy.sql import label
-from common.data.constants import CONN_STRING
+from common.data.constants import CONN_STRING, SEARCH_LIMIT, PAGE_SIZE
+from common.data.constants import DB_POOL_SIZE, DB_MAX_OVERFLOW
+from common.data.constants import DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_NAME
 
 
-main_engine = create_engine(CONN_STRING)
-Session = sessionmaker(main_engine)
-session = Session()
+Session = sessionmaker()
+thread_sessions = scoped_session(Session)
+
+
+def get_engine_options(url):
+    ''' Return the engine options of a connection string, the pool sizes
+    or, for SQLite, the schema map that keeps the MySQL schema out of the
+    table names '''
+
+    options = {'pool_pre_ping': DB_POOL_PRE_PING}
+    if make_url(url).get_backend_name() == 'sqlite':
+        schemas = {'schema_translate_map': {DB_NAME: None}}
+        options['execution_options'] = schemas
+    else:
+        options.update(
+            pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+            pool_recycle=DB_POOL_RECYCLE)
+    return options
+
+
+@lru_cache(maxsize=None)
+def get_engine():
+    ''' Create the main engine, and import its driver, on first use '''
+
+    engine = create_engine(CONN_STRING, **get_engine_options(CONN_STRING))
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', add_sqlite_functions)
+    return engine
+
+
+def add_sqlite_functions(connection, record):
+    ''' Add the MySQL functions used by the queries to a SQLite connection '''
+
+    concat = lambda *x: ''.join('' if y is None else str(y) for y in x)
+    connection.create_function('concat', -1, concat, deterministic=True)
+
+
+def get_session_factory():
+    ''' Return the session factory bound to the main engine '''
+
+    if Session.kw.get('bind') is None:
+        Session.configure(bind=get_engine())
+    return Session
+
+
+def __getattr__(name):
+    ''' Keep main_engine importable while creating it lazily '''
+
+    if name == 'main_engine':
+        return get_engine()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+count_cache = {}
 
 
 @contextmanager
 def alch_session():
-    ''' Return the same session instance every time.
+    ''' Return the same session instance every time in each thread.
     The session must not be closed in a finally sentence'''
 
+    get_session_factory()
+    session = thread_sessions()
+    try:
+        yield session
+        session.commit()
+    except:
+        session.rollback()
+        raise
+
+
+@contextmanager
+def unit_of_work():
+    ''' Return a new session, committed and closed when the block ends '''
+
+    session = get_session_factory()()
     try:
         yield session
         session.commit()
     except:
         session.rollback()
         raise
+    finally:
+        session.close()
+
+
+@contextmanager
+def read_session():
+    ''' Return a new session for queries, closed without committing '''
+
+    session = get_session_factory()()
+    try:
+        yield session
+    finally:
+        session.close()
 
 
 # ============ Top queries ============
-# Set of queries used in the top table
+# Set of queries used in the top table. They belong to no session, so they
+# are run with query.with_session(session) of a short-lived session
 
 def res_top_query():
-    with alch_session() as session:
-        query = session.query(
-            Reservation.id, func.concat(Customer.first_name, ' ', 
-            Customer.last_name).label('customer'), Agency.agency_name,
-            Apartment.apartment_name, Reservation.checkin_date,
-            Reservation.checkout_date, Reservation.guests,
-            Reservation.amount, Reservation.tax, Reservation.deposit, 
-            Reservation.notes
-            ).filter(Reservation.customer_id == Customer.id
-            ).filter(Reservation.agency_id == Agency.id
-            ).filter(Reservation.apartment_id == Apartment.id)
+    query = Query((
+        Reservation.id, func.concat(Customer.first_name, ' ', 
+        Customer.last_name).label('customer'), Agency.agency_name,
+        Apartment.apartment_name, Reservation.checkin_date,
+        Reservation.checkout_date, Reservation.guests,
+        Reservation.amount, Reservation.tax, Reservation.deposit, 
+        Reservation.notes
+        )).select_from(Reservation
+        ).join(Customer, Reservation.customer_id == Customer.id
+        ).join(Agency, Reservation.agency_id == Agency.id
+        ).join(Apartment, Reservation.apartment_id == Apartment.id)
     return query
 
 
 def srv_top_query():
-    with alch_session() as session:
-        query = session.query(
-            Service.id, ServiceCategory.s_category_name, 
-            ServiceType.s_type_name, func.concat(
-            Employee.first_name, ' ', Employee.last_name
-            ).label('employee'), Service.date, Service.time, 
-            Service.hours, Service.extra_price, Service.notes
-            ).filter(Service.reservation_id == Reservation.id
-            ).filter(Service.s_category_id == ServiceCategory.id
-            ).filter(Service.s_type_id == ServiceType.id
-            ).filter(Service.employee_id == Employee.id)
+    query = Query((
+        Service.id, ServiceCategory.s_category_name, 
+        ServiceType.s_type_name, func.concat(
+        Employee.first_name, ' ', Employee.last_name
+        ).label('employee'), Service.date, Service.time, 
+        Service.hours, Service.extra_price, Service.notes
+        )).select_from(Service
+        ).join(Reservation, Service.reservation_id == Reservation.id
+        ).join(ServiceCategory, Service.s_category_id == ServiceCategory.id
+        ).join(ServiceType, Service.s_type_id == ServiceType.id
+        ).join(Employee, Service.employee_id == Employee.id)
     return query
 
 
 def cus_top_query():
-    with alch_session() as session:
-        query = session.query(
-            Customer.id, Customer.first_name, Customer.last_name, 
-            Customer.phone, Customer.email, Customer.language, 
-            Country.country_name, City.city_name, Customer.address, 
-            Customer.zip_code, Customer.notes
-            ).filter(Customer.id == Customer.id
-            ).filter(Customer.country_id == Country.id
-            ).filter(Customer.city_id == City.id)
+    query = Query((
+        Customer.id, Customer.first_name, Customer.last_name, 
+        Customer.phone, Customer.email, Customer.language, 
+        Country.country_name, City.city_name, Customer.address, 
+        Customer.zip_code, Customer.notes
+        )).select_from(Customer
+        ).join(Country, Customer.country_id == Country.id
+        ).join(City, Customer.city_id == City.id)
     return query
 
 
 def emp_top_query():
-    with alch_session() as session:
-        query = session.query(
-            Employee.id, Employee.first_name, Employee.last_name, 
-            Employee.phone, Employee.email, EmployeeCategory.e_category_name, 
-            Employee.start_date, Employee.end_date, Country.country_name, 
-            City.city_name, Employee.address, Employee.zip_code, Employee.notes
-            ).filter(Employee.e_category_id == EmployeeCategory.id
-            ).filter(Employee.country_id == Country.id
-            ).filter(Employee.city_id == City.id)
+    query = Query((
+        Employee.id, Employee.first_name, Employee.last_name, 
+        Employee.phone, Employee.email, EmployeeCategory.e_category_name, 
+        Employee.start_date, Employee.end_date, Country.country_name, 
+        City.city_name, Employee.address, Employee.zip_code, Employee.notes
+        )).select_from(Employee
+        ).join(EmployeeCategory,
+               Employee.e_category_id == EmployeeCategory.id
+        ).join(Country, Employee.country_id == Country.id
+        ).join(City, Employee.city_id == City.id)
     return query
 
 
 def agn_top_query():
-    with alch_session() as session:
-        query = session.query(
-            Agency.id, Agency.agency_name, Agency.phone, Agency.contact_person, 
-            Agency.cp_phone, Agency.email, Agency.website, Country.country_name, 
-            City.city_name, Agency.address, Agency.zip_code, Agency.notes
-            ).filter(Agency.country_id == Country.id
-            ).filter(Agency.city_id == City.id)
+    query = Query((
+        Agency.id, Agency.agency_name, Agency.phone, Agency.contact_person, 
+        Agency.cp_phone, Agency.email, Agency.website, Country.country_name, 
+        City.city_name, Agency.address, Agency.zip_code, Agency.notes
+        )).select_from(Agency
+        ).join(Country, Agency.country_id == Country.id
+        ).join(City, Agency.city_id == City.id)
     return query
 
 
 def own_top_query():
-    with alch_session() as session:
-        query = session.query(
-            Owner.id, Owner.first_name, Owner.last_name, Owner.phone, 
-            Owner.email, Owner.language, Country.country_name, City.city_name, 
-            Owner.address, Owner.zip_code, Owner.notes
-            ).filter(Owner.country_id == Country.id
-            ).filter(Owner.city_id == City.id)
+    query = Query((
+        Owner.id, Owner.first_name, Owner.last_name, Owner.phone, 
+        Owner.email, Owner.language, Country.country_name, City.city_name, 
+        Owner.address, Owner.zip_code, Owner.notes
+        )).select_from(Owner
+        ).join(Country, Owner.country_id == Country.id
+        ).join(City, Owner.city_id == City.id)
     return query
 
 
 def apt_top_query():
-    with alch_session() as session:
-        query = session.query(
-            Apartment.id, Apartment.apartment_name, Apartment.phone, 
-            func.concat(Owner.first_name, ' ', Owner.last_name).label('owner'), 
-            Apartment.max_guests, Country.country_name, City.city_name, 
-            Apartment.address, Apartment.zip_code, Apartment.parking_spaces, 
-            Apartment.notes
-            ).filter(Apartment.owner_id == Owner.id
-            ).filter(Apartment.country_id == Country.id
-            ).filter(Apartment.city_id == City.id)
+    query = Query((
+        Apartment.id, Apartment.apartment_name, Apartment.phone, 
+        func.concat(Owner.first_name, ' ', Owner.last_name).label('owner'), 
+        Apartment.max_guests, Country.country_name, City.city_name, 
+        Apartment.address, Apartment.zip_code, Apartment.parking_spaces, 
+        Apartment.notes
+        )).select_from(Apartment
+        ).join(Owner, Apartment.owner_id == Owner.id
+        ).join(Country, Apartment.country_id == Country.id
+        ).join(City, Apartment.city_id == City.id)
     return query
 
 
@@ -128,7 +212,7 @@ def res_sub_query():
 
 def srv_sub_query():
     query = res_top_query()
-    query = query.filter(Reservation.id == Service.reservation_id)
+    query = query.join(Service, Service.reservation_id == Reservation.id)
     return query
 
 
@@ -180,3 +264,46 @@ def apt_sub_query():
         Reservation.guests, Reservation.amount, Reservation.tax, 
         Reservation.deposit, Reservation.notes)
     return query
+
+
+# ============ Search queries ============
+# Push the search box filter into the database
+
+def search_query(query, text):
+    ''' Filter rows containing text in any displayed column '''
+
+    if not text:
+        return query
+    text = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    columns = [x['expr'] for x in query.column_descriptions]
+    columns = [x if isinstance(x.type, String) else cast(x, String)
+               for x in columns]
+    conditions = [x.like(f'%{text}%', escape='\\') for x in columns]
+    return query.filter(or_(*conditions)).limit(SEARCH_LIMIT)
+
+
+# ============ Pagination ============
+# Keyset pages and cached totals for the top queries
+
+def page_query(query, model, last_id=None, size=PAGE_SIZE):
+    ''' Return the page of query following the row with last_id '''
+
+    if last_id is not None:
+        query = query.filter(model.id > last_id)
+    return query.order_by(model.id).limit(size)
+
+
+def count_query(query, model):
+    ''' Return the cached number of model rows in query '''
+
+    key = str(query.statement)
+    if key not in count_cache:
+        count = query.order_by(None).with_entities(func.count(model.id))
+        count_cache[key] = count.scalar()
+    return count_cache[key]
+
+
+def clear_count_cache():
+    ''' Forget cached totals after rows are created or deleted '''
+
+    count_cache.clear()
@@ -0,0 +1,106 @@
+import asyncio
+from weakref import WeakKeyDictionary
+from contextlib import asynccontextmanager
+from sqlalchemy import event, func
+from common.connections.alchemy_cn import count_cache, page_query
+from common.connections.alchemy_cn import get_engine_options
+from common.connections.alchemy_cn import add_sqlite_functions
+from common.data.constants import ASYNC_CONN_STRING
+
+
+# Pooled connections belong to the event loop that opened them
+async_engines = WeakKeyDictionary()
+
+
+# Async drivers (aiomysql, aiosqlite) and greenlet are optional, they are
+# imported with the engine so the synchronous application never needs them
+
+def get_async_engine():
+    ''' Return the async engine of the running loop, created on first use '''
+
+    loop = asyncio.get_running_loop()
+    if (engine := async_engines.get(loop)) is not None:
+        return engine
+    try:
+        from sqlalchemy.ext.asyncio import create_async_engine
+    except ImportError as exc:
+        raise ImportError(
+            'The async backend needs greenlet and an async driver, '
+            'install them with: pip install greenlet aiomysql') from exc
+
+    options = get_engine_options(ASYNC_CONN_STRING)
+    engine = create_async_engine(ASYNC_CONN_STRING, **options)
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine.sync_engine, 'connect', add_sqlite_functions)
+    async_engines[loop] = engine
+    return engine
+
+
+async def dispose_async_engine():
+    ''' Close the pooled connections of the running loop engine '''
+
+    loop = asyncio.get_running_loop()
+    if (engine := async_engines.pop(loop, None)) is not None:
+        await engine.dispose()
+
+
+def run_sync(function, *args):
+    ''' Run a coroutine function from synchronous code, like installers,
+    in a new event loop that closes its connections at the end '''
+
+    async def run():
+        try:
+            return await function(*args)
+        finally:
+            await dispose_async_engine()
+    return asyncio.run(run())
+
+
+@asynccontextmanager
+async def async_session():
+    ''' Return a new async session, committed and closed at the end '''
+
+    from sqlalchemy.ext.asyncio import AsyncSession
+    session = AsyncSession(get_async_engine(), expire_on_commit=False)
+    try:
+        yield session
+        await session.commit()
+    except:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
+
+# ============ Async queries ============
+# Run the queries of alchemy_cn, each one in its own connection
+
+async def fetch_all(query):
+    ''' Return every row of a query built by alchemy_cn '''
+
+    async with async_session() as session:
+        result = await session.execute(query.statement)
+        return result.all()
+
+
+async def fetch_count(query, model):
+    ''' Return the cached number of model rows in query '''
+
+    key = str(query.statement)
+    if key not in count_cache:
+        count = query.order_by(None).with_entities(func.count(model.id))
+        async with async_session() as session:
+            count_cache[key] = await session.scalar(count.statement)
+    return count_cache[key]
+
+
+async def fetch_screen(top_query, sub_query, model):
+    ''' Return first top page, top total and sub rows of the first top row.
+    The three queries are issued at the same time '''
+
+    first_id = page_query(top_query, model, size=1).with_entities(model.id)
+    sub_query = sub_query.filter(model.id == first_id.scalar_subquery())
+    return await asyncio.gather(
+        fetch_all(page_query(top_query, model)),
+        fetch_count(top_query, model),
+        fetch_all(sub_query))
@@ -5,13 +5,31 @@ from decouple import config
 APT_VIEW_PATH = './apps/apartments/views/apartments_vi.ui'
 FORM_VIEW_PATH = './apps/apartments/views/form_vi.ui'
 CITY_FORM_VIEW_PATH = './apps/apartments/views/city_form_vi.ui'
+ANALYTICS_VIEW_PATH = './apps/apartments/views/analytics_vi.ui'
 EXPORTS_PATH = './common/resources/exports/'
 DICTIONARY_PATH = 'sqlite:///common/resources/dbs/dictionary.db'
+DICTIONARY_FILE = './common/resources/dbs/dictionary.db'
+DICTIONARY_BUNDLE_PATH = './common/resources/dbs/dictionary.bundle'
 LOREM_PATH = './common/resources/texts/lorem_ipsum.txt'
+PROFILE_LOG_PATH = './common/resources/logs/profile.log'
 QSS_STYLES_PATH = './common/resources/styles/'
 ICONS_PATH = './common/resources/icons/'
 
 
+# Interface settings
+TABLE_BATCH_SIZE = 200
+PAGE_SIZE = 1000
+SEARCH_DELAY = 300  # Milliseconds without typing before searching
+SEARCH_LIMIT = 500
+PROFILE_LOG_SIZE = 1_000_000  # Bytes per log file, 3 backups are kept
+SLOW_QUERY_MS = 100
+EXPORT_BATCH_SIZE = 5000  # Rows read and written at a time
+EXPORT_QUEUE_SIZE = 4  # Batches waiting for each writer
+PRINT_FONT_SIZE = 8  # Points
+PRINT_SAMPLE_ROWS = 200  # Rows measured to size the printed columns
+REPEATED_QUERY_LIMIT = 3  # Same statement shape per action, likely N+1
+
+
 # Environment variables
 DB_DRIVER = config('DB_DRIVER')
 DB_USER = config('DB_USER')
@@ -19,7 +37,31 @@ DB_PASSWORD = config('DB_PASSWORD')
 DB_HOST = config('DB_HOST')
 DB_PORT = config('DB_PORT')
 DB_NAME = config('DB_NAME')
+SEARCH_INDEX = config('SEARCH_INDEX', default=False, cast=bool)
+DB_POOL_SIZE = config('DB_POOL_SIZE', default=5, cast=int)
+DB_MAX_OVERFLOW = config('DB_MAX_OVERFLOW', default=10, cast=int)
+DB_POOL_RECYCLE = config('DB_POOL_RECYCLE', default=3600, cast=int)
+DB_POOL_PRE_PING = config('DB_POOL_PRE_PING', default=True, cast=bool)
+DB_WORKERS = config('DB_WORKERS', default=4, cast=int)  # 0 runs queries inline
+INSTANCE_CACHE_SIZE = config('INSTANCE_CACHE_SIZE', default=256, cast=int)
+PREFETCH_ROWS = config('PREFETCH_ROWS', default=20, cast=int)  # 0 disables
+PROFILE = config('PROFILE', default=False, cast=bool)
+ASYNC_DB = config('ASYNC_DB', default=False, cast=bool)
+ASYNC_DB_DRIVER = config('ASYNC_DB_DRIVER', default='mysql+aiomysql')
+EXPORT_COMPRESSION = config('EXPORT_COMPRESSION', default='zstd')  # Or none
+PRINT_PREVIEW_PAGES = config('PRINT_PREVIEW_PAGES', default=50, cast=int)
+EXPORT_ROW_GROUP_SIZE = config('EXPORT_ROW_GROUP_SIZE', default=100_000, cast=int)
+
 
+# Main Connection String, DB_URL replaces it (sqlite:///file.db for tests)
+DB_URL = config('DB_URL', default='')
+CONN_STRING = DB_URL or f'{DB_DRIVER}://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
+ASYNC_CONN_STRING = f'{ASYNC_DB_DRIVER}://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
 
-# Main Connection String
-CONN_STRING = f'{DB_DRIVER}://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
+# The async driver of each backend, used with DB_URL
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'mysql': 'mysql+aiomysql'}
+if DB_URL:
+    DB_SCHEME, DB_ADDRESS = DB_URL.split('://', 1)
+    DB_BACKEND = DB_SCHEME.split('+')[0]
+    ASYNC_SCHEME = ASYNC_DRIVERS.get(DB_BACKEND, DB_SCHEME)
+    ASYNC_CONN_STRING = f'{ASYNC_SCHEME}://{DB_ADDRESS}'
@@ -0,0 +1,205 @@
+from datetime import timedelta
+from sqlalchemy import case, cast, func, literal
+from sqlalchemy.types import Date, Float, Integer
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.ext.compiler import compiles
+from common.connections.alchemy_cn import read_session
+from common.connections.alchemy_cn import Agency, Apartment, Owner
+from common.connections.alchemy_cn import Reservation
+
+
+# Date functions of MySQL, compiled to the native ones of SQLite so the sums
+# are computed by the database on both
+
+class days_between(FunctionElement):
+    ''' Days from the second date to the first one '''
+
+    type = Integer()
+    name = 'days_between'
+    inherit_cache = True
+
+
+class latest(FunctionElement):
+    type = Date()
+    name = 'latest'
+    inherit_cache = True
+
+
+class earliest(FunctionElement):
+    type = Date()
+    name = 'earliest'
+    inherit_cache = True
+
+
+@compiles(days_between)
+def compile_days_between(element, compiler, **kw):
+    return f'DATEDIFF({compiler.process(element.clauses, **kw)})'
+
+
+@compiles(days_between, 'sqlite')
+def compile_days_between_sqlite(element, compiler, **kw):
+    end, start = [compiler.process(x, **kw) for x in element.clauses]
+    return f'CAST(julianday({end}) - julianday({start}) AS INTEGER)'
+
+
+@compiles(latest)
+def compile_latest(element, compiler, **kw):
+    return f'GREATEST({compiler.process(element.clauses, **kw)})'
+
+
+@compiles(latest, 'sqlite')
+def compile_latest_sqlite(element, compiler, **kw):
+    return f'MAX({compiler.process(element.clauses, **kw)})'
+
+
+@compiles(earliest)
+def compile_earliest(element, compiler, **kw):
+    return f'LEAST({compiler.process(element.clauses, **kw)})'
+
+
+@compiles(earliest, 'sqlite')
+def compile_earliest_sqlite(element, compiler, **kw):
+    return f'MIN({compiler.process(element.clauses, **kw)})'
+
+
+GROUPS = ('apartment', 'agency', 'owner')
+COLUMNS = (
+    'reservations', 'nights', 'occupancy', 'adr', 'revpar', 'revenue', 'tax',
+    'deposit')
+
+
+class AnalyticsManager:
+    ''' Occupancy and revenue of every apartment, agency or owner over a
+    period. The database sums the nights and prorated amounts of the stays,
+    NumPy derives the rates and the daily occupancy, and reports are cached
+    by period until a reservation changes '''
+
+    def __init__(self):
+        self.reports = {}  # Report of each (group, first, last)
+
+    def get_report(self, group, first, last):
+        ''' Return the cached report of a period or None '''
+
+        return self.reports.get((group, first, last))
+
+    def set_report(self, report):
+        key = (report['group'], report['first'], report['last'])
+        self.reports[key] = report
+
+    def invalidate(self):
+        self.reports.clear()
+
+    @staticmethod
+    def load_members(session, group):
+        ''' Return the reservation column of the group, and the id, name
+        and apartments of each member, None for the whole portfolio '''
+
+        if group == 'apartment':
+            members = session.query(
+                Apartment.id, Apartment.apartment_name, literal(1))
+            return Reservation.apartment_id, members.order_by(
+                Apartment.apartment_name).all()
+        if group == 'owner':
+            members = session.query(
+                Owner.id, Owner.first_name + ' ' + Owner.last_name,
+                func.count(Apartment.id)).outerjoin(Owner.apartment)
+            return Apartment.owner_id, members.group_by(Owner.id).order_by(
+                Owner.first_name, Owner.last_name).all()
+        if group == 'agency':
+            members = session.query(Agency.id, Agency.agency_name)
+            members = members.order_by(Agency.agency_name)
+            return Reservation.agency_id, [(x, y, None) for x, y in members]
+        raise ValueError(f'Unknown group {group}')
+
+    @staticmethod
+    def load_report(group, first, last):
+        ''' Compute the report of the dates from first to last, both
+        included. Nothing is cached here, so it can run in a worker '''
+
+        import numpy as np
+
+        end = last + timedelta(days=1)
+        start_date, end_date = literal(first, Date), literal(end, Date)
+        stay_start = latest(Reservation.checkin_date, start_date)
+        stay_end = earliest(Reservation.checkout_date, end_date)
+        nights = days_between(stay_end, stay_start)
+        ratio = cast(nights, Float) / func.nullif(days_between(
+            Reservation.checkout_date, Reservation.checkin_date), 0)
+        overlaps = (Reservation.checkin_date < end_date) & (
+            Reservation.checkout_date > start_date)
+        deposit = case(
+            (Reservation.checkin_date >= start_date, Reservation.deposit),
+            else_=0)
+
+        with read_session() as session:
+            key, members = AnalyticsManager.load_members(session, group)
+            # Grouped by an expression, the rows are read in table order
+            # instead of in the order of an index on the key
+            member = (key + 0).label('member')
+            sums = session.query(
+                member, func.count(Reservation.id), func.sum(nights),
+                func.sum(Reservation.amount * ratio),
+                func.sum(Reservation.tax * ratio), func.sum(deposit))
+            if group == 'owner':
+                sums = sums.join(Reservation.apartment)
+            sums = sums.filter(overlaps).group_by('member').all()
+            portfolio = session.query(func.count(Apartment.id)).scalar()
+
+            # Stays with the same dates are counted at once
+            stays = session.query(
+                Reservation.checkin_date, Reservation.checkout_date,
+                func.count(Reservation.id)).filter(overlaps).group_by(
+                Reservation.checkin_date, Reservation.checkout_date).all()
+
+        sums = {x[0]: x[1:] for x in sums}
+        if None in sums:
+            members.append((None, '', None))  # Reservations without agency
+        days = (end - first).days
+        values = np.array(
+            [sums.get(x, (0,) * 5) for x, _, _ in members],
+            dtype=float).reshape(-1, 5)
+        values = np.nan_to_num(values)  # Sums of no rows are NULL
+        apartments = np.array(
+            [portfolio if x is None else x for _, _, x in members],
+            dtype=float)
+        totals = values.sum(axis=0, keepdims=True)
+        return {
+            'group': group, 'first': first, 'last': last,
+            'names': [y or '' for _, y, _ in members],
+            'rows': AnalyticsManager.get_rates(
+                np, values, apartments * days).tolist(),
+            'total': AnalyticsManager.get_rates(
+                np, totals, np.array([portfolio * days], dtype=float)
+                )[0].tolist(),
+            'daily': AnalyticsManager.get_daily_occupancy(
+                np, stays, first, days, portfolio)}
+
+    @staticmethod
+    def get_rates(np, values, available):
+        ''' Return reservations, nights, occupancy %, ADR, RevPAR, revenue,
+        tax and deposit of the sums of each member and its nights for rent '''
+
+        count, nights, revenue, tax, deposit = values.T
+        divide = lambda x, y: np.divide(
+            x, y, out=np.zeros_like(x), where=y > 0)
+        return np.column_stack([
+            count, nights, divide(nights * 100, available),
+            divide(revenue, nights), divide(revenue, available), revenue, tax,
+            deposit]).round(2)
+
+    @staticmethod
+    def get_daily_occupancy(np, stays, first, days, apartments):
+        ''' Return the % of apartments occupied each night of the period
+        starting on first, from the checkin, checkout and count of stays '''
+
+        if not apartments:
+            return np.zeros(days)
+        changes = np.zeros(days + 1)
+        if stays:
+            checkins, checkouts, counts = zip(*stays)
+            nights = lambda x: np.clip(
+                (np.array(x, dtype='datetime64[D]') - np.datetime64(first)
+                 ).astype(int), 0, days)
+            np.add.at(changes, nights(checkins), counts)
+            np.add.at(changes, nights(checkouts), np.negative(counts))
+        return np.cumsum(changes[:-1]) * 100 / apartments
@@ -0,0 +1,148 @@
+from bisect import bisect_left
+from collections import defaultdict
+from common.connections.alchemy_cn import read_session, Apartment, Reservation
+
+
+class Calendar:
+    ''' Reservations of one apartment as [checkin, checkout) intervals
+    sorted by checkin. The running maximum of the checkouts answers if a
+    period is free with one bisection, even if old stays overlap '''
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.ids = []
+        self.max_ends = []
+
+    def add(self, reservation_id, checkin, checkout):
+        i = bisect_left(self.starts, checkin)
+        self.starts.insert(i, checkin)
+        self.ends.insert(i, checkout)
+        self.ids.insert(i, reservation_id)
+        self.max_ends.insert(i, checkout)
+        self.update_max_ends(i)
+
+    def remove(self, reservation_id, checkin):
+        i = bisect_left(self.starts, checkin)
+        i = self.ids.index(reservation_id, i)
+        for values in (self.starts, self.ends, self.ids, self.max_ends):
+            del values[i]
+        self.update_max_ends(i)
+
+    def update_max_ends(self, start):
+        ''' Recompute the running maximum from a changed position on '''
+
+        previous = self.max_ends[start - 1] if start else None
+        for i in range(start, len(self.ends)):
+            if previous is not None and previous > self.ends[i]:
+                self.max_ends[i] = previous
+            else:
+                self.max_ends[i] = previous = self.ends[i]
+
+    def get_overlaps(self, checkin, checkout):
+        ''' Return the reservations overlapping [checkin, checkout) '''
+
+        i = bisect_left(self.starts, checkout) - 1
+        overlaps = []
+        while i >= 0 and self.max_ends[i] > checkin:
+            if self.ends[i] > checkin:
+                overlaps.append(self.ids[i])
+            i -= 1
+        return overlaps
+
+
+class AvailabilityManager:
+    ''' Index the reservations of every apartment by dates to find free
+    apartments without querying the reservation table. Loaded in
+    background or on first use, then kept in sync as reservations are
+    saved and deleted '''
+
+    def __init__(self):
+        self.apartments = None  # Max guests of each apartment id
+        self.calendars = defaultdict(Calendar)
+        self.reservations = {}  # Apartment and dates of each reservation
+        self.changes = 0  # Reservations saved or deleted, to drop old loads
+
+    def load(self):
+        if self.apartments is None:
+            self.set_index(*self.load_index())
+
+    @staticmethod
+    def load_index():
+        ''' Fetch apartments and reservation dates. Nothing is cached here,
+        so it can run in a worker thread '''
+
+        with read_session() as session:
+            apartments = session.query(Apartment.id, Apartment.max_guests)
+            reservations = session.query(
+                Reservation.id, Reservation.apartment_id,
+                Reservation.checkin_date, Reservation.checkout_date
+                ).order_by(Reservation.apartment_id, Reservation.checkin_date)
+            return dict(apartments.all()), reservations.all()
+
+    def set_index(self, apartments, reservations):
+        ''' Index the rows of load_index, already sorted by checkin '''
+
+        self.apartments = apartments
+        self.calendars.clear()
+        self.reservations.clear()
+        for reservation_id, apartment_id, checkin, checkout in reservations:
+            calendar = self.calendars[apartment_id]
+            calendar.starts.append(checkin)
+            calendar.ends.append(checkout)
+            calendar.ids.append(reservation_id)
+            self.reservations[reservation_id] = (
+                apartment_id, checkin, checkout)
+        for calendar in self.calendars.values():
+            calendar.max_ends = list(calendar.ends)
+            calendar.update_max_ends(0)
+
+    def is_free(self, apartment_id, checkin, checkout, ignore_id=None):
+        ''' Return if an apartment has no reservation in the period, other
+        than ignore_id, the reservation being edited '''
+
+        self.load()
+        if (calendar := self.calendars.get(apartment_id)) is None:
+            return True
+        overlaps = calendar.get_overlaps(checkin, checkout)
+        return all(x == ignore_id for x in overlaps)
+
+    def get_free_apartments(self, checkin, checkout, guests=1):
+        ''' Return the ids of the apartments free in the period for that
+        number of guests. Apartments without max guests always fit '''
+
+        self.load()
+        fits = lambda x: x is None or x >= guests
+        return [
+            x for x, y in sorted(self.apartments.items())
+            if fits(y) and self.is_free(x, checkin, checkout)]
+
+    def add(self, reservation):
+        ''' Index a saved reservation, replacing its previous dates '''
+
+        self.changes += 1
+        if self.apartments is None:
+            return  # Loaded with the reservation on first use
+        self.remove(reservation.id)
+        self.calendars[reservation.apartment_id].add(
+            reservation.id, reservation.checkin_date,
+            reservation.checkout_date)
+        self.reservations[reservation.id] = (
+            reservation.apartment_id, reservation.checkin_date,
+            reservation.checkout_date)
+
+    def remove(self, reservation_id):
+        ''' Drop a deleted reservation from the index '''
+
+        self.changes += 1
+        if (dates := self.reservations.pop(int(reservation_id), None)):
+            apartment_id, checkin, _ = dates
+            self.calendars[apartment_id].remove(int(reservation_id), checkin)
+
+    def invalidate(self):
+        ''' Forget everything, to load it again on the next use '''
+
+        self.changes += 1
+        self.apartments = None
+        self.calendars.clear()
+        self.reservations.clear()
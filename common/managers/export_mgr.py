@@ -0,0 +1,237 @@
+import os
+import csv
+import json
+import queue
+from abc import ABC, abstractmethod
+from html import escape
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QObject, pyqtSignal
+from common.connections.alchemy_cn import read_session
+from common.data.constants import EXPORT_BATCH_SIZE, EXPORT_QUEUE_SIZE
+from common.data.constants import EXPORT_COMPRESSION, EXPORT_ROW_GROUP_SIZE
+
+
+class CsvWriter:
+    extension = 'csv'
+    binary = False
+
+    def __init__(self, file, columns, types):
+        self.writer = csv.writer(file)
+        self.writer.writerow(columns)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        pass
+
+
+class JsonLinesWriter:
+    extension = 'jsonl'
+    binary = False
+
+    def __init__(self, file, columns, types):
+        self.file = file
+        self.columns = columns
+
+    def write(self, rows):
+        self.file.writelines(
+            json.dumps(dict(zip(self.columns, x)), default=str) + '\n'
+            for x in rows)
+
+    def close(self):
+        pass
+
+
+class HtmlWriter:
+    extension = 'html'
+    binary = False
+
+    def __init__(self, file, columns, types):
+        self.file = file
+        headers = ''.join(f'<th>{escape(x)}</th>' for x in columns)
+        self.file.write(
+            '<table border="1" style="border-collapse:collapse">\n'
+            f'<thead><tr>{headers}</tr></thead>\n<tbody>\n')
+
+    def write(self, rows):
+        self.file.writelines(
+            '<tr>' + ''.join(
+                f'<td>{"" if y is None else escape(str(y))}</td>' for y in x)
+            + '</tr>\n' for x in rows)
+
+    def close(self):
+        self.file.write('</tbody>\n</table>\n')
+
+
+# pyarrow is optional, it is imported by the columnar writers on first use
+
+def get_arrow_type(pa, column_type):
+    ''' Return the Arrow type of a SQLAlchemy column type, text by default '''
+
+    from sqlalchemy import types
+    arrow_types = (
+        (types.Boolean, pa.bool_()), (types.SmallInteger, pa.int16()),
+        (types.Integer, pa.int64()), (types.Numeric, pa.float64()),
+        (types.DateTime, pa.timestamp('us')), (types.Date, pa.date32()),
+        (types.Time, pa.time64('us')))
+    for sql_type, arrow_type in arrow_types:
+        if isinstance(column_type, sql_type):
+            return arrow_type
+    return pa.string()
+
+
+class ArrowWriter(ABC):
+    ''' Write typed columns, gathering batches up to EXPORT_ROW_GROUP_SIZE
+    rows so the file is not split in as many chunks as batches read '''
+
+    binary = True
+
+    def __init__(self, file, columns, types):
+        import pyarrow as pa
+        self.pa = pa
+        self.schema = pa.schema(
+            [(x, get_arrow_type(pa, y)) for x, y in zip(columns, types)])
+        self.compression = None
+        if EXPORT_COMPRESSION.lower() != 'none':
+            self.compression = EXPORT_COMPRESSION
+        self.batches = []
+        self.rows = 0
+        self.writer = self.get_writer(file)
+
+    @abstractmethod
+    def get_writer(self, file):
+        raise NotImplementedError(
+            'users must define get_writer to use this base class')
+
+    def write(self, rows):
+        arrays = [
+            self.pa.array(x, type=y.type)
+            for x, y in zip(zip(*rows), self.schema)]
+        self.batches.append(
+            self.pa.record_batch(arrays, schema=self.schema))
+        self.rows += len(rows)
+        if self.rows >= EXPORT_ROW_GROUP_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.batches:
+            table = self.pa.Table.from_batches(self.batches, self.schema)
+            self.write_table(table)
+            self.batches, self.rows = [], 0
+
+    @abstractmethod
+    def write_table(self, table):
+        raise NotImplementedError(
+            'users must define write_table to use this base class')
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+class ParquetWriter(ArrowWriter):
+    extension = 'parquet'
+
+    def get_writer(self, file):
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(
+            file, self.schema, compression=self.compression or 'none')
+
+    def write_table(self, table):
+        self.writer.write_table(table, row_group_size=EXPORT_ROW_GROUP_SIZE)
+
+
+class FeatherWriter(ArrowWriter):
+    ''' Feather version 2, which is the Arrow IPC file format '''
+
+    extension = 'feather'
+
+    def get_writer(self, file):
+        options = self.pa.ipc.IpcWriteOptions(compression=self.compression)
+        return self.pa.ipc.new_file(file, self.schema, options=options)
+
+    def write_table(self, table):
+        self.writer.write_table(table, max_chunksize=EXPORT_ROW_GROUP_SIZE)
+
+
+WRITERS = (CsvWriter, JsonLinesWriter, HtmlWriter)
+COLUMNAR_WRITERS = (ParquetWriter, FeatherWriter)
+
+
+def get_writers():
+    ''' Return the writers, the columnar ones only if pyarrow is installed '''
+
+    try:
+        import pyarrow
+    except ImportError:
+        return WRITERS
+    return WRITERS + COLUMNAR_WRITERS
+
+
+class ExportManager(QObject):
+    ''' Export rows to every format at the same time, a batch at a time.
+    Batches go from one reader to a writer thread per file through
+    bounded queues, so memory does not grow with the number of rows '''
+
+    progress = pyqtSignal(int, int)  # Rows written and total rows
+
+    def export(self, rows, columns, types, folder, total):
+        ''' Write rows, a query or a list, to the folder files and return
+        their paths. Types are the SQLAlchemy types of the columns, used by
+        the columnar formats. It blocks, so it is meant to run in a worker '''
+
+        writers = get_writers()
+        paths = [os.path.join(folder, f'data.{x.extension}') for x in writers]
+        queues = [queue.Queue(EXPORT_QUEUE_SIZE) for _ in writers]
+        with ThreadPoolExecutor(len(writers)) as executor:
+            futures = [
+                executor.submit(self.write_file, x, y, columns, types, z)
+                for x, y, z in zip(writers, paths, queues)]
+            written = 0
+            try:
+                for batch in self.get_batches(rows):
+                    for batches in queues:
+                        batches.put(batch)
+                    written += len(batch)
+                    self.progress.emit(written, total)
+            finally:
+                for batches in queues:
+                    batches.put(None)
+            return [x.result() for x in futures]  # Raise writer errors
+
+    @staticmethod
+    def get_batches(rows):
+        ''' Yield lists of rows, streaming them if rows is a query '''
+
+        if isinstance(rows, (list, tuple)):
+            for i in range(0, len(rows), EXPORT_BATCH_SIZE):
+                yield rows[i:i + EXPORT_BATCH_SIZE]
+            return
+        with read_session() as session:
+            query = rows.with_session(session).yield_per(EXPORT_BATCH_SIZE)
+            iterator = iter(query)
+            while (batch := list(islice(iterator, EXPORT_BATCH_SIZE))):
+                yield batch
+
+    @staticmethod
+    def write_file(writer_class, path, columns, types, batches):
+        ''' Write the batches of a queue until None is received '''
+
+        finished = False
+        options = {'mode': 'w', 'newline': '', 'encoding': 'utf-8'}
+        if writer_class.binary:
+            options = {'mode': 'wb'}
+        try:
+            with open(path, **options) as file:
+                writer = writer_class(file, columns, types)
+                while (batch := batches.get()) is not None:
+                    writer.write(batch)
+                finished = True
+                writer.close()
+        except Exception:
+            while not finished and batches.get() is not None:
+                pass  # Keep the reader from blocking on a full queue
+            raise
+        return path
@@ -0,0 +1,116 @@
+from collections import defaultdict
+from itertools import count
+
+
+class IndexManager:
+    ''' Trigram index over table rows for substring search in memory
+
+    Rows are indexed by their distinct column values, and trigrams point
+    to those values, so repeated names, dates or agencies are only split
+    into trigrams once and a match can never span two columns '''
+
+    def __init__(self):
+        self.rows = {}
+        self.positions = {}
+        self.values = {}
+        self.trigrams = defaultdict(set)
+        self.counter = count()
+
+    def clear(self):
+        ''' Drop every indexed row '''
+
+        self.rows.clear()
+        self.positions.clear()
+        self.values.clear()
+        self.trigrams.clear()
+        self.counter = count()
+
+    def build(self, rows):
+        ''' Index every row, dropping the previous content '''
+
+        self.clear()
+        for row in rows:
+            self.add(row)
+
+    def add(self, row):
+        ''' Index one row by the values of its columns '''
+
+        row_id = int(row[0])
+        self.rows[row_id] = row
+        self.positions.setdefault(row_id, next(self.counter))
+        for value in self.get_row_values(row):
+            if (ids := self.values.get(value)) is None:
+                ids = self.values[value] = set()
+                for trigram in self.get_trigrams(value):
+                    self.trigrams[trigram].add(value)
+            ids.add(row_id)
+
+    def remove(self, row_id):
+        ''' Drop one row, and the values no other row uses '''
+
+        if (row := self.rows.pop(row_id, None)) is None:
+            return
+        del self.positions[row_id]
+        for value in self.get_row_values(row):
+            ids = self.values[value]
+            ids.discard(row_id)
+            if ids:
+                continue
+            del self.values[value]
+            for trigram in self.get_trigrams(value):
+                values = self.trigrams[trigram]
+                values.discard(value)
+                if not values:
+                    del self.trigrams[trigram]
+
+    def refresh(self, row_id, row):
+        ''' Replace an indexed row, or remove it if row is None '''
+
+        position = self.positions.get(row_id)
+        self.remove(row_id)
+        if row is not None:
+            if position is not None:
+                self.positions[row_id] = position
+            self.add(row)
+
+    def search(self, text):
+        ''' Return indexed rows containing text in any column '''
+
+        text = text.lower()
+        if not text:
+            ids = list(self.rows)
+        else:
+            if len(text) < 3:
+                candidates = self.values
+            else:
+                candidates = self.get_candidates(text)
+            values = [x for x in candidates if text in x]
+            ids = set().union(*[self.values[x] for x in values])
+        ids = sorted(ids, key=self.positions.__getitem__)
+        return [self.rows[x] for x in ids]
+
+    def get_candidates(self, text):
+        ''' Intersect trigram postings, starting from the smallest one '''
+
+        postings = [self.trigrams.get(x) for x in self.get_trigrams(text)]
+        if not all(postings):
+            return set()
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for values in postings[1:]:
+            candidates &= values
+            if not candidates:
+                break
+        return candidates
+
+    @staticmethod
+    def get_row_values(row):
+        ''' Return the distinct lowered texts of the row columns '''
+
+        return {str(x).lower() for x in row}
+
+    @staticmethod
+    def get_trigrams(text):
+        ''' Return the set of three characters substrings of text '''
+
+        return {text[i:i + 3] for i in range(len(text) - 2)}
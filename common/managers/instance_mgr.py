@@ -0,0 +1,53 @@
+from collections import OrderedDict
+from common.data.constants import INSTANCE_CACHE_SIZE
+
+
+class InstanceManager:
+    ''' Keep the most recently used form instances, keyed by model and id.
+    Instances are detached, so they must be read only '''
+
+    def __init__(self, size=INSTANCE_CACHE_SIZE):
+        self.instances = OrderedDict()
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model, instance_id):
+        ''' Return a cached instance, or None if it must be loaded '''
+
+        key = (model, int(instance_id))
+        if (instance := self.instances.get(key)) is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.instances.move_to_end(key)
+        return instance
+
+    def add(self, instance):
+        ''' Cache an instance, dropping the least recently used one '''
+
+        if self.size <= 0:
+            return
+        key = (type(instance), instance.id)
+        self.instances[key] = instance
+        self.instances.move_to_end(key)
+        if len(self.instances) > self.size:
+            self.instances.popitem(last=False)
+
+    def invalidate(self, model=None, instance_id=None):
+        ''' Forget one instance, every instance of a model, or everything '''
+
+        if model is None:
+            self.instances.clear()
+        elif instance_id is not None:
+            self.instances.pop((model, int(instance_id)), None)
+        else:
+            for key in [x for x in self.instances if x[0] == model]:
+                del self.instances[key]
+
+    def get_stats(self):
+        ''' Return hits, misses and size of the cache for diagnostics '''
+
+        return {
+            'hits': self.hits, 'misses': self.misses,
+            'cached': len(self.instances), 'size': self.size}
@@ -1,32 +1,90 @@
-from common.data.constants import DICTIONARY_PATH, LOREM_PATH
-from sqlalchemy import create_engine
-import pandas as pd
+from common.data.constants import DICTIONARY_FILE, DICTIONARY_BUNDLE_PATH
+from common.data.constants import LOREM_PATH
+from functools import lru_cache
 import random as rd
+import marshal
+import os
 
 
 class LangManager:
     ''' Manage translations and retrieve random text '''
 
     def __init__(self):
-        ''' Get translations table from sqlite '''
-
-        dict_engine = create_engine(DICTIONARY_PATH)
-        self.dictionary = pd.read_sql('dictionary', dict_engine)
+        self.dictionaries = None
         self.act_language = None
-        
+        self.act_dictionary = {}
+
+    def get_dictionaries(self):
+        ''' Load translations the first time they are needed '''
+
+        if self.dictionaries is None:
+            self.dictionaries = self.load_bundle()
+            if self.dictionaries is None:
+                self.dictionaries = self.load_dictionaries()
+        return self.dictionaries
+
+    @staticmethod
+    def get_source_stamp():
+        ''' Return modification time and size of the dictionary database '''
+
+        stat = os.stat(DICTIONARY_FILE)
+        return stat.st_mtime_ns, stat.st_size
+
+    @classmethod
+    def load_bundle(cls):
+        ''' Return the compiled translations, or None if missing or stale '''
+
+        try:
+            with open(DICTIONARY_BUNDLE_PATH, 'rb') as file:
+                stamp, dictionaries = marshal.load(file)
+            if tuple(stamp) == cls.get_source_stamp():
+                return dictionaries
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+
+    @staticmethod
+    def load_dictionaries():
+        ''' Return a text to translation dict for every language '''
+
+        import sqlite3
+        with sqlite3.connect(DICTIONARY_FILE) as connection:
+            cursor = connection.execute('SELECT * FROM dictionary')
+            columns = [x[0] for x in cursor.description]
+            rows = cursor.fetchall()
+        connection.close()
+
+        languages = [x for x in columns if x not in ('text', 'type')]
+        dictionaries = {x: {} for x in languages}
+        for row in rows:
+            row = dict(zip(columns, row))
+            for language in languages:
+                dictionaries[language][row['text']] = row[language]
+        return dictionaries
+
+    @classmethod
+    def compile_bundle(cls):
+        ''' Write the translations of the database to the bundle file '''
+
+        bundle = (cls.get_source_stamp(), cls.load_dictionaries())
+        with open(DICTIONARY_BUNDLE_PATH, 'wb') as file:
+            marshal.dump(bundle, file)
+        return bundle[1]
+
     def change_language(self, language):
         ''' Change active language in application '''
 
         self.act_language = language
-        
+        self.act_dictionary = self.get_dictionaries().get(language, {})
+
     def translate(self, word):
         ''' Translate word to active language '''
 
-        try:
-            df = self.dictionary
-            return df[df['text']==word][self.act_language].values[0]
-        except:
-            pass
+        return self.act_dictionary.get(word)
+
+    def translate_many(self, words):
+        ''' Translate several words to active language '''
+
+        return [self.act_dictionary.get(x) for x in words]
 
     @staticmethod
     def lorem_ipsum(num_lines):
@@ -41,3 +99,10 @@ class LangManager:
             return lines[:-2]  # Delete the lines end "\n"
         except:
             pass
+
+
+@lru_cache(maxsize=None)
+def get_lang_manager():
+    ''' Return the translation service shared by every controller '''
+
+    return LangManager()
@@ -0,0 +1,56 @@
+from sqlalchemy import select, literal, cast, union_all, String
+from common.connections.alchemy_cn import read_session
+
+
+class LookupManager:
+    ''' Cache the (id, text) pairs shown in the form combo boxes '''
+
+    def __init__(self):
+        self.lookups = {}
+
+    def get_lookups(self, combos):
+        ''' Return lookups for every combo model, loading the missing ones '''
+
+        if (missing := self.get_missing(combos)):
+            self.add_lookups(self.load_lookups(missing))
+        return {x.get_model(): self.lookups[x.get_model()] for x in combos}
+
+    def get_missing(self, combos):
+        ''' Return the display column of the combo models not cached yet '''
+
+        columns = {x.get_model(): x.get_column() for x in combos}
+        return {x: y for x, y in columns.items() if x not in self.lookups}
+
+    def add_lookups(self, lookups):
+        ''' Cache lookups loaded by load_lookups '''
+
+        self.lookups.update(lookups)
+
+    @staticmethod
+    def load_lookups(columns):
+        ''' Fetch id and display text of several models in one query.
+        Nothing is cached here, so it can run in a worker thread '''
+
+        selects = [
+            select(
+                literal(model.__tablename__).label('model'),
+                model.id.label('id'),
+                cast(column, String).label('text'))
+            for model, column in columns.items()]
+        statement = union_all(*selects) if len(selects) > 1 else selects[0]
+        with read_session() as session:
+            rows = session.execute(statement).all()
+
+        models = {x.__tablename__: x for x in columns}
+        lookups = {x: [] for x in columns}
+        for model_name, instance_id, text in rows:
+            lookups[models[model_name]].append((instance_id, text))
+        return lookups
+
+    def invalidate(self, model=None):
+        ''' Forget one model lookups, or all of them if no model is given '''
+
+        if model is None:
+            self.lookups.clear()
+        else:
+            self.lookups.pop(model, None)
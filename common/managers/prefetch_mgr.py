@@ -0,0 +1,55 @@
+from apps.apartments.models.apartments_mdl import Document
+
+
+class PrefetchManager:
+    ''' Keep sub rows, form instance and documents of the first top rows,
+    so navigating through them does not query the database again '''
+
+    def __init__(self):
+        self.rows = {}
+
+    def set_rows(self, rows):
+        ''' Replace the prefetched rows with the ones loaded by load_rows '''
+
+        self.rows = rows
+
+    def get_sub_rows(self, top_id):
+        ''' Return the sub rows of a top row, or None if not prefetched '''
+
+        if (prefetched := self.rows.get(top_id)) is not None:
+            return prefetched[0]
+
+    def get_form_data(self, top_id):
+        ''' Return instance and document paths of a top row, or None '''
+
+        if (prefetched := self.rows.get(top_id)) is not None:
+            return prefetched[1:]
+
+    @staticmethod
+    def load_rows(session, sub_query, model, top_ids):
+        ''' Fetch sub rows, instances and documents of several top rows in
+        three queries. Nothing is cached here, so it can run in a worker '''
+
+        if not top_ids:
+            return {}
+        condition = model.id.in_(top_ids)
+        sub_rows = {x: [] for x in top_ids}
+        query = sub_query.with_session(session).add_columns(model.id)
+        for *row, top_id in query.filter(condition):
+            sub_rows[top_id].append(tuple(row))
+
+        instances = session.query(model).filter(condition).all()
+        entity_ids = [x.entity_id for x in instances]
+        paths = {x: [] for x in entity_ids}
+        query = session.query(Document.foreign_entity_id, Document.file_path)
+        condition = Document.foreign_entity_id.in_(entity_ids)
+        for entity_id, path in query.filter(condition):
+            paths[entity_id].append(path)
+
+        return {
+            x.id: (sub_rows[x.id], x, paths[x.entity_id]) for x in instances}
+
+    def invalidate(self):
+        ''' Forget every prefetched row after a change in the database '''
+
+        self.rows.clear()
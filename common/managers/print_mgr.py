@@ -0,0 +1,134 @@
+from math import ceil
+from itertools import chain, islice
+from PyQt5.QtCore import Qt, QObject, QRect, QMarginsF, pyqtSignal
+from PyQt5.QtGui import QFont, QColor, QPainter, QPdfWriter
+from PyQt5.QtGui import QPageSize, QPageLayout
+from common.managers.export_mgr import ExportManager
+from common.data.constants import PRINT_FONT_SIZE, PRINT_SAMPLE_ROWS
+
+
+class PrintManager(QObject):
+    ''' Paint rows as table pages straight on a paged device, a printer or
+    a PDF file, repeating the headers on every page. Rows are painted as
+    they are read, so only the pages asked for are ever laid out '''
+
+    progress = pyqtSignal(int, int)  # Rows painted and total rows
+
+    def paint(self, device, rows, columns, total, first_page=1, last_page=0):
+        ''' Paint the pages of rows, a query or a list, from first_page to
+        last_page, 0 for the last one, and return the pages painted '''
+
+        painter = QPainter()
+        if not painter.begin(device):
+            raise RuntimeError('The printer or file cannot be opened')
+        batches = ExportManager.get_batches(rows)
+        try:
+            font = QFont(painter.font())
+            font.setPointSize(PRINT_FONT_SIZE)
+            painter.setFont(font)
+            rows = chain.from_iterable(batches)
+            sample = list(islice(rows, PRINT_SAMPLE_ROWS))
+            layout = self.get_layout(painter, device, columns, sample)
+            per_page = layout['rows_per_page']
+            pages = max(ceil(total / per_page), 1)
+            last_page = min(last_page or pages, pages)
+
+            skipped = (first_page - 1) * per_page
+            rows = islice(chain(sample, rows), skipped, None)
+            painted = 0
+            for page in range(first_page, last_page + 1):
+                page_rows = list(islice(rows, per_page))
+                if not page_rows and painted:
+                    break
+                if painted:
+                    device.newPage()
+                self.paint_page(painter, layout, columns, page_rows)
+                self.paint_footer(painter, layout, f'{page} / {pages}')
+                painted += 1
+                self.progress.emit(min(page * per_page, total), total)
+            return painted
+        finally:
+            batches.close()  # Release the session of a query not read
+            painter.end()
+
+    @staticmethod
+    def get_layout(painter, device, columns, sample):
+        ''' Return the column widths, fitted to the page width, and the
+        heights of the rows measured on the sample rows '''
+
+        metrics = painter.fontMetrics()
+        padding = metrics.averageCharWidth()
+        widths = [metrics.horizontalAdvance(str(x)) for x in columns]
+        for row in sample:
+            for i, value in enumerate(row):
+                text = '' if value is None else str(value)
+                widths[i] = max(widths[i], metrics.horizontalAdvance(text))
+
+        page = QRect(0, 0, device.width(), device.height())
+        widths = [x + 2 * padding for x in widths]
+        ratio = page.width() / sum(widths)  # Shrink or stretch to the page
+        widths = [int(x * ratio) for x in widths]
+
+        row_height = metrics.height() + padding
+        body_height = page.height() - 2 * row_height  # Header and footer
+        return {
+            'page': page, 'widths': widths, 'padding': padding,
+            'row_height': row_height,
+            'rows_per_page': max(body_height // row_height - 1, 1)}
+
+    def paint_page(self, painter, layout, columns, rows):
+        ''' Paint the header and rows of one page '''
+
+        font = painter.font()
+        bold = QFont(font)
+        bold.setBold(True)
+        painter.setFont(bold)
+        top = layout['page'].top()
+        painter.fillRect(
+            0, top, sum(layout['widths']), layout['row_height'],
+            QColor(230, 230, 230))
+        self.paint_row(painter, layout, columns, top)
+        painter.setFont(font)
+        for row in rows:
+            top += layout['row_height']
+            self.paint_row(painter, layout, row, top)
+
+    @staticmethod
+    def paint_row(painter, layout, row, top):
+        ''' Paint the cells of a row, eliding the texts that do not fit '''
+
+        metrics = painter.fontMetrics()
+        padding = layout['padding']
+        height = layout['row_height']
+        left = 0
+        for value, width in zip(row, layout['widths']):
+            cell = QRect(left, top, width, height)
+            painter.drawRect(cell)
+            text = '' if value is None else str(value)
+            text = metrics.elidedText(text, Qt.ElideRight, width - 2 * padding)
+            painter.drawText(
+                cell.adjusted(padding, 0, -padding, 0),
+                Qt.AlignLeft | Qt.AlignVCenter, text)
+            left += width
+
+    @staticmethod
+    def paint_footer(painter, layout, text):
+        ''' Paint the page number under the table '''
+
+        page = layout['page']
+        footer = QRect(
+            page.left(), page.bottom() - layout['row_height'],
+            page.width(), layout['row_height'])
+        painter.drawText(footer, Qt.AlignRight | Qt.AlignVCenter, text)
+
+    def write_pdf(self, rows, columns, path, total):
+        ''' Paint every row on a new A4 landscape PDF file and return its
+        path. It blocks, so it is meant to run in a worker '''
+
+        writer = QPdfWriter(path)
+        writer.setResolution(300)
+        writer.setPageSize(QPageSize(QPageSize.A4))
+        writer.setPageOrientation(QPageLayout.Landscape)
+        writer.setPageMargins(QMarginsF(10, 10, 10, 10), QPageLayout.Millimeter)
+        self.paint(writer, rows, columns, total)
+        return path
@@ -0,0 +1,164 @@
+import os
+import json
+import logging
+import threading
+from functools import wraps
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from logging.handlers import RotatingFileHandler
+from timeit import default_timer as timer
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QLabel
+from common.managers.query_mgr import QueryCounter
+from common.data.constants import PROFILE, PROFILE_LOG_PATH, PROFILE_LOG_SIZE
+
+
+class ProfileManager:
+    ''' Measure controller actions: wall time until their background
+    requests finish, SQL statements and time, rows loaded in the tables
+    and time spent rendering them. Repeated and slow statements are
+    logged as warnings. Off unless PROFILE is set '''
+
+    def __init__(self, worker_mgr, status_bar, enabled=PROFILE):
+        self.enabled = enabled
+        self.worker_mgr = worker_mgr
+        self.current = None
+        self.waiting = False
+        self.history = deque(maxlen=100)  # Last actions, for diagnostics
+        self.lock = threading.Lock()
+        if not enabled:
+            return
+
+        self.label = QLabel()
+        status_bar.addPermanentWidget(self.label)
+        self.logger = self.get_logger()
+        worker_mgr.busy_changed.connect(self.on_busy_changed)
+        event.listen(Engine, 'before_cursor_execute', self.before_execute)
+        event.listen(Engine, 'after_cursor_execute', self.after_execute)
+
+    def close(self):
+        ''' Stop listening to the SQL statements '''
+
+        if self.enabled:
+            event.remove(Engine, 'before_cursor_execute', self.before_execute)
+            event.remove(Engine, 'after_cursor_execute', self.after_execute)
+            self.enabled = False
+
+    @staticmethod
+    def get_logger():
+        ''' Return the logger writing one JSON line per action '''
+
+        logger = logging.getLogger('apartments.profile')
+        if not logger.handlers:
+            os.makedirs(os.path.dirname(PROFILE_LOG_PATH), exist_ok=True)
+            handler = RotatingFileHandler(
+                PROFILE_LOG_PATH, maxBytes=PROFILE_LOG_SIZE, backupCount=3)
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+        return logger
+
+    def track(self, name, function):
+        ''' Return a slot running function as an action, if profiling is on.
+        The slot takes no arguments, so clicked(bool) is not passed on '''
+
+        if not self.enabled:
+            return function
+
+        @wraps(function)
+        def slot():
+            with self.action(name, interrupt=True):
+                function()
+        return slot
+
+    def action(self, name, interrupt=False):
+        ''' Measure the block as an action, unless one is already running.
+        With interrupt, an action waiting for its requests is closed '''
+
+        running = self.current is not None
+        if interrupt and self.waiting:
+            running = False
+        main_thread = threading.current_thread() is threading.main_thread()
+        if not self.enabled or running or not main_thread:
+            return nullcontext()  # Nested calls belong to the outer action
+        return self.run_action(name)
+
+    @contextmanager
+    def run_action(self, name):
+        if self.waiting:
+            self.finish()  # A new action interrupts the previous one
+        with self.lock:
+            self.current = {
+                'action': name, 'start': timer(), 'queries': QueryCounter(),
+                'rows': 0, 'render_ms': 0.0}
+        try:
+            yield
+        finally:
+            if self.worker_mgr.workers:
+                self.waiting = True  # Finished by on_busy_changed
+            else:
+                self.finish()
+
+    @contextmanager
+    def render(self, rows):
+        ''' Add the rows and rendering time of a table load to the action '''
+
+        start = timer()
+        yield
+        if self.enabled and self.current is not None:
+            self.current['rows'] += rows
+            self.current['render_ms'] += (timer() - start) * 1000
+
+    def on_busy_changed(self, busy):
+        if not busy and self.waiting:
+            # Results are delivered after busy_changed, and may start more
+            QTimer.singleShot(0, self.finish_if_idle)
+
+    def finish_if_idle(self):
+        if self.waiting and not self.worker_mgr.workers:
+            self.finish()
+
+    def before_execute(self, conn, cursor, statement, params, context, many):
+        conn.info.setdefault('profile_start', []).append(timer())
+
+    def after_execute(self, conn, cursor, statement, params, context, many):
+        elapsed = (timer() - conn.info['profile_start'].pop()) * 1000
+        with self.lock:
+            if self.current is not None:
+                self.current['queries'].add(statement, elapsed)
+
+    def finish(self):
+        ''' Close the running action, then show and log its figures '''
+
+        with self.lock:
+            profile, self.current = self.current, None
+        self.waiting = False
+        if profile is None:
+            return
+        profile['wall_ms'] = (timer() - profile.pop('start')) * 1000
+        for key in ('wall_ms', 'render_ms'):
+            profile[key] = round(profile[key], 1)
+        profile.update(profile.pop('queries').get_report())
+        self.history.append(profile)
+        self.label.setText(self.get_summary(profile))
+        if profile['repeated'] or profile['slow']:
+            self.logger.warning(json.dumps(profile))
+        else:
+            self.logger.info(json.dumps(profile))
+
+    @staticmethod
+    def get_summary(profile):
+        ''' Return the status bar text of an action '''
+
+        summary = (
+            f'{profile["action"]}: {profile["wall_ms"]:.0f} ms | '
+            f'SQL {profile["sql"]} ({profile["sql_ms"]:.0f} ms) | '
+            f'{profile["rows"]} rows | render {profile["render_ms"]:.0f} ms')
+        if profile['repeated']:
+            summary += f' | N+1: {len(profile["repeated"])}'
+        if profile['slow']:
+            summary += f' | slow: {len(profile["slow"])}'
+        return summary
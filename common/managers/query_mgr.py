@@ -0,0 +1,88 @@
+import re
+import threading
+from collections import Counter, defaultdict
+from timeit import default_timer as timer
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from common.data.constants import SLOW_QUERY_MS, REPEATED_QUERY_LIMIT
+
+
+SPACES = re.compile(r'\s+')
+IN_LISTS = re.compile(r'\bIN \((?:[^()]|\([^()]*\))*\)', re.IGNORECASE)
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def normalize(statement):
+    ''' Return the shape of a statement, without values or list lengths '''
+
+    statement = SPACES.sub(' ', statement).strip()
+    statement = IN_LISTS.sub('IN (?)', statement)
+    return LITERALS.sub('?', statement)
+
+
+class QueryCounter:
+    ''' Group SQL statements by shape to find repeated and slow ones.
+    As a context manager it listens to every engine while the block runs,
+    otherwise statements are added by whoever owns it '''
+
+    def __init__(self, slow_ms=SLOW_QUERY_MS, limit=REPEATED_QUERY_LIMIT):
+        self.slow_ms = slow_ms
+        self.limit = limit
+        self.counts = Counter()
+        self.times = defaultdict(float)
+        self.slowest = {}
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        event.listen(Engine, 'before_cursor_execute', self.before_execute)
+        event.listen(Engine, 'after_cursor_execute', self.after_execute)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(Engine, 'before_cursor_execute', self.before_execute)
+        event.remove(Engine, 'after_cursor_execute', self.after_execute)
+
+    def before_execute(self, conn, cursor, statement, params, context, many):
+        conn.info.setdefault('query_start', []).append(timer())
+
+    def after_execute(self, conn, cursor, statement, params, context, many):
+        elapsed = (timer() - conn.info['query_start'].pop()) * 1000
+        self.add(statement, elapsed)
+
+    def add(self, statement, elapsed):
+        ''' Count one statement and its milliseconds '''
+
+        shape = normalize(statement)
+        with self.lock:
+            self.counts[shape] += 1
+            self.times[shape] += elapsed
+            self.slowest[shape] = max(self.slowest.get(shape, 0), elapsed)
+
+    @property
+    def count(self):
+        return sum(self.counts.values())
+
+    @property
+    def total_ms(self):
+        return sum(self.times.values())
+
+    def get_repeated(self):
+        ''' Return the shapes run at least limit times, like N+1 loops '''
+
+        return [(x, y) for x, y in self.counts.most_common() if y >= self.limit]
+
+    def get_slow(self):
+        ''' Return the shapes that took longer than slow_ms at least once '''
+
+        slow = [(x, y) for x, y in self.slowest.items() if y > self.slow_ms]
+        return sorted(slow, key=lambda x: x[1], reverse=True)
+
+    def get_report(self):
+        ''' Return counts and warnings, ready to be logged as JSON '''
+
+        return {
+            'sql': self.count, 'sql_ms': round(self.total_ms, 1),
+            'repeated': [
+                {'count': y, 'sql': x} for x, y in self.get_repeated()],
+            'slow': [
+                {'ms': round(y, 1), 'sql': x} for x, y in self.get_slow()]}
@@ -0,0 +1,174 @@
+from datetime import time
+from collections import defaultdict
+from sqlalchemy import and_, exists
+from common.connections.alchemy_cn import read_session, unit_of_work
+from common.connections.alchemy_cn import Employee, Entity, Reservation
+from common.connections.alchemy_cn import Service
+
+
+HOST, CLEANER = 1, 2  # Employee categories
+CHECK_IN, CHECK_OUT, CLEANING = 1, 2, 3  # Service categories
+
+# Hours a host can meet the guests at each stage, and the hour of the
+# cleaning relative to the host service
+STAGES = {
+    CHECK_IN: (range(13, 24), -1),  # Cleaning one hour before the welcome
+    CHECK_OUT: (range(7, 12), 1)}  # Cleaning one hour after the farewell
+
+
+def get_service_type(srv_date, hour):
+    ''' Weekend, day-time or night-time service type id '''
+
+    return 3 if srv_date.weekday() > 4 else 1 if hour > 8 else 2
+
+
+class Schedule:
+    ''' Busy hours of every employee. Each employee is a bit, and each date
+    and hour keeps the bitmap of the busy ones, so the free employees of a
+    category are found with a few integer operations, however many '''
+
+    def __init__(self):
+        self.employee_ids = []  # Employee id of each bit
+        self.bits = {}  # Bit of each employee id
+        self.periods = {}  # Contract dates of each bit, if known
+        self.categories = defaultdict(int)  # Employees of each category
+        self.cursors = defaultdict(int)  # Next bit tried in each category
+        self.busy = defaultdict(int)  # Busy employees of each date and hour
+
+    def add_employee(self, employee_id, category_id, start=None, end=None):
+        bit = len(self.employee_ids)
+        self.employee_ids.append(employee_id)
+        self.bits[employee_id] = bit
+        self.categories[category_id] |= 1 << bit
+        if start or end:
+            self.periods[bit] = (start, end)
+
+    def book(self, employee_id, srv_date, hour, hours=1):
+        ''' Mark an employee busy from hour for a number of hours '''
+
+        if (bit := self.bits.get(employee_id)) is None:
+            return  # Not an employee scheduled here
+        for i in range(hour, min(hour + hours, 24)):
+            self.busy[(srv_date, i)] |= 1 << bit
+
+    def get_free_employee(self, srv_date, hour, category_id, hours=1):
+        ''' Return an employee of the category free for the hours, taking
+        turns so the work is shared, or None '''
+
+        free = self.categories[category_id]
+        for i in range(hour, min(hour + hours, 24)):
+            free &= ~self.busy.get((srv_date, i), 0)
+        cursor = self.cursors[category_id]
+        for candidates in (free >> cursor << cursor, free):
+            while candidates:
+                bit = (candidates & -candidates).bit_length() - 1
+                candidates &= candidates - 1
+                if self.is_hired(bit, srv_date):
+                    self.cursors[category_id] = bit + 1
+                    return self.employee_ids[bit]
+        return None
+
+    def is_hired(self, bit, srv_date):
+        start, end = self.periods.get(bit, (None, None))
+        if start and srv_date < start:
+            return False
+        return not end or srv_date <= end
+
+    def assign_stage(self, srv_date, stage, hours=None):
+        ''' Book a host and a cleaner for a check-in or check-out, trying
+        the hours of the stage in order. Return the services as (employee,
+        category, hour) or None if nobody is free '''
+
+        stage_hours, cleaning_offset = STAGES[stage]
+        for hour in hours or stage_hours:
+            cleaning_hour = hour + cleaning_offset
+            host_id = self.get_free_employee(srv_date, hour, HOST)
+            cleaner_id = self.get_free_employee(
+                srv_date, cleaning_hour, CLEANER)
+            if host_id and cleaner_id:
+                self.book(host_id, srv_date, hour)
+                self.book(cleaner_id, srv_date, cleaning_hour)
+                return [
+                    (host_id, stage, hour),
+                    (cleaner_id, CLEANING, cleaning_hour)]
+        return None
+
+
+class ScheduleManager:
+    ''' Create the check-in and check-out services missing in reservations,
+    assigning free employees. Meant to run in a worker thread '''
+
+    @staticmethod
+    def load_schedule(session, first_date, last_date):
+        ''' Return the schedule of the employees between two dates '''
+
+        schedule = Schedule()
+        employees = session.query(
+            Employee.id, Employee.e_category_id, Employee.start_date,
+            Employee.end_date).order_by(Employee.id)
+        for employee_id, category_id, start, end in employees:
+            if end and start and end < start:
+                end = None  # An end before the start marks an open contract
+            schedule.add_employee(employee_id, category_id, start, end)
+        services = session.query(
+            Service.employee_id, Service.date, Service.time, Service.hours
+            ).filter(Service.date.between(first_date, last_date))
+        for employee_id, srv_date, srv_time, hours in services:
+            schedule.book(
+                employee_id, srv_date, srv_time.hour, max(hours.hour, 1))
+        return schedule
+
+    @staticmethod
+    def get_missing_stages(session):
+        ''' Return (reservation id, date, stage) of the check-ins and
+        check-outs without service, by date '''
+
+        missing = []
+        for stage, column in (
+                (CHECK_IN, Reservation.checkin_date),
+                (CHECK_OUT, Reservation.checkout_date)):
+            has_service = exists().where(and_(
+                Service.reservation_id == Reservation.id,
+                Service.s_category_id == stage))
+            query = session.query(Reservation.id, column).filter(~has_service)
+            missing += [(x, y, stage) for x, y in query]
+        return sorted(missing, key=lambda x: (x[1], x[0]))
+
+    @staticmethod
+    def get_mappings(reservation_id, srv_date, services):
+        ''' Return the Service rows of a stage assigned by the schedule '''
+
+        return [{
+            'reservation_id': reservation_id, 's_category_id': category_id,
+            's_type_id': get_service_type(srv_date, hour),
+            'employee_id': employee_id, 'date': srv_date, 'time': time(hour),
+            'hours': time(1), 'extra_price': 0.00}
+            for employee_id, category_id, hour in services]
+
+    def assign_services(self):
+        ''' Create every missing check-in and check-out service and return
+        how many were created, and how many stages found nobody free '''
+
+        with read_session() as session:
+            if not (missing := self.get_missing_stages(session)):
+                return 0, 0
+            schedule = self.load_schedule(
+                session, missing[0][1], missing[-1][1])
+
+        mappings = []
+        unassigned = 0
+        for reservation_id, srv_date, stage in missing:
+            if (services := schedule.assign_stage(srv_date, stage)):
+                mappings += self.get_mappings(
+                    reservation_id, srv_date, services)
+            else:
+                unassigned += 1
+
+        with unit_of_work() as session:
+            entities = [Entity() for _ in mappings]
+            session.add_all(entities)
+            session.flush()
+            for mapping, entity in zip(mappings, entities):
+                mapping['entity_id'] = entity.id
+            session.bulk_insert_mappings(Service, mappings)
+        return len(mappings), unassigned
@@ -0,0 +1,45 @@
+import sys
+import json
+from timeit import default_timer as timer
+from PyQt5.QtCore import QObject, QEvent, QCoreApplication
+
+
+# Modules kept out of startup, imported only to print or export
+DEFERRED_MODULES = ('pandas', 'numpy', 'PyQt5.Qt', 'PyQt5.QtPrintSupport')
+
+
+class StartupManager(QObject):
+    ''' Measure startup phases until the main window is first painted '''
+
+    def __init__(self, start_time):
+        super().__init__()
+        self.marks = [('start', start_time)]
+
+    def mark(self, phase):
+        ''' Record the end of a startup phase '''
+
+        self.marks.append((phase, timer()))
+
+    def watch(self, window):
+        ''' Wait for the first paint of window to report and quit '''
+
+        window.installEventFilter(self)
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint:
+            watched.removeEventFilter(self)
+            self.mark('first_paint')
+            print(json.dumps(self.get_report(), indent=4))
+            QCoreApplication.quit()
+        return False
+
+    def get_report(self):
+        ''' Return milliseconds per phase and the deferred modules loaded '''
+
+        phases = {}
+        for (_, start), (phase, end) in zip(self.marks, self.marks[1:]):
+            phases[phase] = round((end - start) * 1000, 1)
+        total = (self.marks[-1][1] - self.marks[0][1]) * 1000
+        loaded = [x for x in DEFERRED_MODULES if x in sys.modules]
+        return {'phases_ms': phases, 'total_ms': round(total, 1),
+                'deferred_modules_loaded': loaded}
@@ -1,5 +1,3 @@
-import PyQt5
-from PyQt5.Qt import *
 from PyQt5.QtGui import *
 from PyQt5.QtCore import *
 from PyQt5.QtWidgets import *
@@ -0,0 +1,176 @@
+import asyncio
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QCoreApplication
+from PyQt5.QtCore import pyqtSignal
+from common.data.constants import DB_WORKERS
+
+
+qt_loop = None  # Asyncio loop driven by Qt, set by install_qt_loop
+
+
+def install_qt_loop(app):
+    ''' Run asyncio inside the Qt event loop with qasync, if installed '''
+
+    global qt_loop
+    try:
+        import qasync
+    except ImportError:
+        return None
+    qt_loop = qasync.QEventLoop(app)
+    asyncio.set_event_loop(qt_loop)
+    return qt_loop
+
+
+class WorkerSignals(QObject):
+    ''' Carry a worker outcome back to the thread that started it '''
+
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+
+
+class Worker(QRunnable):
+    ''' Run one function in the thread pool '''
+
+    def __init__(self, function, *args):
+        super().__init__()
+        self.function = function
+        self.args = args
+        self.signals = WorkerSignals()
+        self.cancelled = False
+        self.setAutoDelete(False)
+
+    def release(self):
+        ''' Disconnect the signals so callbacks no longer keep references '''
+
+        self.cancelled = True
+        self.signals.finished.disconnect()
+        self.signals.failed.disconnect()
+
+    def run(self):
+        if self.cancelled:
+            return
+        try:
+            result = self.function(*self.args)
+        except Exception as exc:
+            self.signals.failed.emit(exc)
+        else:
+            self.signals.finished.emit(result)
+
+
+class WorkerManager(QObject):
+    ''' Run database requests in background threads, one per key.
+    A new request cancels the previous one with the same key, and results
+    of cancelled requests are dropped before reaching their callback '''
+
+    busy_changed = pyqtSignal(bool)
+    failed = pyqtSignal(object)
+
+    def __init__(self, max_threads=DB_WORKERS):
+        super().__init__()
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(max(max_threads, 1))
+        self.synchronous = (max_threads == 0)
+        self.workers = {}
+
+    def run(self, key, callback, function, *args):
+        ''' Call function in a worker and callback with its result '''
+
+        self.cancel(key)
+        if self.synchronous:
+            return self.run_now(callback, function, *args)
+
+        worker = Worker(function, *args)
+        worker.signals.finished.connect(
+            lambda result: self.finish(key, worker, callback, result))
+        worker.signals.failed.connect(
+            lambda exc: self.finish(key, worker, self.failed.emit, exc))
+        self.workers[key] = worker
+        if len(self.workers) == 1:
+            self.busy_changed.emit(True)
+        self.thread_pool.start(worker)
+
+    def run_now(self, callback, function, *args):
+        ''' Call function and callback in the current thread, reporting
+        errors of both through the failed signal '''
+
+        try:
+            result = function(*args)
+        except Exception as exc:
+            self.failed.emit(exc)
+        else:
+            callback(result)
+
+    def has_qt_loop(self):
+        ''' Return whether coroutines can run in the Qt event loop '''
+
+        return qt_loop is not None
+
+    def run_async(self, key, callback, function, *args):
+        ''' Await coroutine function in the Qt asyncio loop and callback
+        with its result. It needs install_qt_loop to be called first '''
+
+        self.cancel(key)
+        task = qt_loop.create_task(function(*args))
+        task.add_done_callback(
+            lambda task: self.finish_task(key, task, callback))
+        self.workers[key] = task
+        if len(self.workers) == 1:
+            self.busy_changed.emit(True)
+
+    def finish_task(self, key, task, callback):
+        ''' Deliver the task result if the request was not cancelled '''
+
+        if self.workers.get(key) is not task or task.cancelled():
+            return
+        del self.workers[key]
+        if not self.workers:
+            self.busy_changed.emit(False)
+        if (exc := task.exception()) is not None:
+            return self.failed.emit(exc)
+        self.run_now(callback, task.result)
+
+    def finish(self, key, worker, callback, result):
+        ''' Deliver the result if the request was not cancelled '''
+
+        if self.workers.get(key) is not worker:
+            return
+        del self.workers[key]
+        worker.release()
+        if not self.workers:
+            self.busy_changed.emit(False)
+        self.run_now(callback, lambda: result)
+
+    def cancel(self, key):
+        ''' Drop the pending request of key, if there is one '''
+
+        if (worker := self.workers.pop(key, None)) is None:
+            return
+        if isinstance(worker, asyncio.Task):
+            worker.cancel()
+        else:
+            worker.release()
+            self.thread_pool.tryTake(worker)
+        if not self.workers:
+            self.busy_changed.emit(False)
+
+    def cancel_all(self, keep=()):
+        ''' Drop every pending request, except the ones of keep keys '''
+
+        for key in list(self.workers):
+            if key not in keep:
+                self.cancel(key)
+
+    def shutdown(self):
+        ''' Drop every request and wait for the running ones, so none of
+        them emits once the application objects are deleted '''
+
+        self.cancel_all()
+        self.thread_pool.waitForDone()
+
+    def wait_for_done(self):
+        ''' Block until every request, and the ones they start, is done '''
+
+        while self.workers:
+            self.thread_pool.waitForDone(10)
+            QCoreApplication.processEvents()
+            if qt_loop is not None and not qt_loop.is_running():
+                qt_loop.run_until_complete(asyncio.sleep(0.01))
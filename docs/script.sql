@@ -259,6 +259,15 @@ CREATE TABLE `apartment_manager_db`.`action` (
     CONSTRAINT `fk_action_user` FOREIGN KEY (`user_id`) REFERENCES user(`id`) ON DELETE CASCADE
 );
 
+-- Creating indexes for the screen queries
+CREATE INDEX `ix_document_foreign_entity` ON `apartment_manager_db`.`document` (`foreign_entity_id`);
+CREATE INDEX `ix_apartment_owner` ON `apartment_manager_db`.`apartment` (`owner_id`);
+CREATE INDEX `ix_reservation_apartment_checkin` ON `apartment_manager_db`.`reservation` (`apartment_id`, `checkin_date`);
+CREATE INDEX `ix_reservation_customer_checkin` ON `apartment_manager_db`.`reservation` (`customer_id`, `checkin_date`);
+CREATE INDEX `ix_reservation_agency_checkin` ON `apartment_manager_db`.`reservation` (`agency_id`, `checkin_date`);
+CREATE INDEX `ix_service_reservation_date` ON `apartment_manager_db`.`service` (`reservation_id`, `date`);
+CREATE INDEX `ix_service_employee_date` ON `apartment_manager_db`.`service` (`employee_id`, `date`);
+
 -- Inserting data into: 'employee_category'
 INSERT INTO `apartment_manager_db`.`employee_category`(`category`) VALUES ('Host'), ('Cleaner');
 
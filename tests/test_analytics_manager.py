@@ -0,0 +1,115 @@
+import unittest
+import numpy as np
+from datetime import date, timedelta
+from unittest import TestCase
+from common.connections.alchemy_cn import *
+from common.managers.analytics_mgr import AnalyticsManager, GROUPS
+
+
+class AnalyticsManagerTest(TestCase):
+    ''' Check the reports against the reservations read one by one '''
+
+    def setUp(self):
+        with read_session() as session:
+            first = session.query(func.min(Reservation.checkin_date)).scalar()
+            self.reservations = session.query(
+                Reservation.checkin_date, Reservation.checkout_date,
+                Reservation.amount, Reservation.tax, Reservation.deposit
+                ).all()
+            self.apartments = session.query(Apartment).count()
+        self.first = date(first.year, 1, 1)
+        self.last = date(first.year, 12, 31)
+
+
+    def check_totals(self, first, last):
+        ''' Check the totals of a period against the stays read one by one '''
+
+        end = last + timedelta(days=1)
+        count = nights = revenue = tax = deposit = 0
+        for checkin, checkout, amount, *taxes in self.reservations:
+            stay_tax, stay_deposit = taxes
+            stay_nights = (min(checkout, end) - max(checkin, first)).days
+            if stay_nights <= 0:
+                continue
+            count += 1
+            nights += stay_nights
+            ratio = stay_nights / (checkout - checkin).days
+            revenue += amount * ratio
+            tax += stay_tax * ratio
+            deposit += stay_deposit if checkin >= first else 0
+
+        report = AnalyticsManager.load_report('apartment', first, last)
+        total = report['total']
+        days = (end - first).days
+        available = self.apartments * days
+        self.assertEqual(total[:2], [count, nights])
+        self.assertAlmostEqual(total[2], nights * 100 / available, places=1)
+        self.assertAlmostEqual(total[3], revenue / nights, places=1)
+        self.assertAlmostEqual(total[5], revenue, places=1)
+        self.assertAlmostEqual(total[6], tax, places=1)
+        self.assertAlmostEqual(total[7], deposit, places=1)
+        self.assertEqual(len(report['daily']), days)
+        self.assertAlmostEqual(
+            report['daily'].mean(), nights * 100 / available)
+
+
+    def test_totals(self):
+        ''' Check if the stays of a whole year are summed '''
+
+        self.check_totals(self.first, self.last)
+
+
+    def test_prorated_totals(self):
+        ''' Check if stays cut by the period are prorated by their nights
+        inside it '''
+
+        first = self.first + timedelta(days=9)
+        self.check_totals(first, first + timedelta(days=10))
+
+
+    def test_groups(self):
+        ''' Check if every group adds up to the same totals '''
+
+        reports = [
+            AnalyticsManager.load_report(x, self.first, self.last)
+            for x in GROUPS]
+        for report in reports:
+            rows = np.array(report['rows'])
+            self.assertEqual(len(rows), len(report['names']))
+            self.assertEqual(rows[:, 1].sum(), reports[0]['total'][1])
+            self.assertAlmostEqual(
+                rows[:, 5].sum(), reports[0]['total'][5], places=0)
+        self.assertEqual(len(reports[0]['rows']), self.apartments)
+
+
+    def test_daily_occupancy(self):
+        ''' Check if stays fill the nights from their first to their last '''
+
+        first = date(2021, 1, 1)
+        stays = [
+            (date(2020, 12, 30), date(2021, 1, 3), 2),
+            (date(2021, 1, 3), date(2021, 1, 9), 1)]
+        occupancy = AnalyticsManager.get_daily_occupancy(
+            np, stays, first, 5, 4)
+        self.assertEqual(occupancy.tolist(), [50, 50, 25, 25, 25])
+        empty = AnalyticsManager.get_daily_occupancy(np, [], first, 3, 4)
+        self.assertEqual(empty.tolist(), [0, 0, 0])
+
+
+    def test_cache(self):
+        ''' Check if reports are kept by period until invalidated '''
+
+        analytics_mgr = AnalyticsManager()
+        report = {'group': 'owner', 'first': self.first, 'last': self.last}
+        analytics_mgr.set_report(report)
+        self.assertIs(
+            analytics_mgr.get_report('owner', self.first, self.last), report)
+        self.assertIsNone(
+            analytics_mgr.get_report('agency', self.first, self.last))
+        analytics_mgr.invalidate()
+        self.assertIsNone(
+            analytics_mgr.get_report('owner', self.first, self.last))
+
+
+if __name__ == '__main__':
+    unittest.main()
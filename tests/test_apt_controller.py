@@ -1,13 +1,23 @@
 import unittest
 from unittest import TestCase
+from unittest.mock import patch
+from threading import Event
 from PyQt5.QtWidgets import QApplication, QMainWindow
 from apps.apartments.controllers.apartments_ctr import ApartmentsController
 from apps.apartments.models.apartments_mdl import *
+from common.managers.query_mgr import QueryCounter
+from common.connections.alchemy_cn import read_session, page_query
+from common.connections.alchemy_cn import res_top_query
+from common.managers.index_mgr import IndexManager
 import sys
 
 
 app = QApplication(sys.argv)
 ctr = ApartmentsController(app)
+ctr.worker_mgr.wait_for_done()
+
+# Top page, top total, prefetched sub rows, instances and documents, lookups
+SCREEN_QUERIES = 6
 
 
 class ControllerTest(TestCase):
@@ -22,8 +32,8 @@ class ControllerTest(TestCase):
     def test_extended_widgets(self):
         ''' Check if extended widget classes are set '''
 
-        self.assertIsInstance(ctr.top_table, xQTableWidget)
-        self.assertIsInstance(ctr.sub_table, xQTableWidget)
+        self.assertIsInstance(ctr.top_table, xQTableView)
+        self.assertIsInstance(ctr.sub_table, xQTableView)
         self.assertIsInstance(ctr.field_id, xQIdLineEdit)
         self.assertIsInstance(ctr.field_notes, xQNotesTextEdit)
         self.assertIsInstance(ctr.attachments_list, xQListWidget)
@@ -55,6 +65,7 @@ class ControllerTest(TestCase):
 
         self.assertEqual(ctr.labels[0].text(), 'Cliente')
         ctr.translate_app('french')
+        ctr.worker_mgr.wait_for_done()
         self.assertEqual(ctr.labels[0].text(), 'Client')
 
 
@@ -70,12 +81,240 @@ class ControllerTest(TestCase):
                 QDoubleSpinBox, QDateEdit, QTimeEdit))
 
 
-    def test_format_html(self):
-        previous_text = 'border="1"'
-        expected_text = 'border="1" style="border-collapse:collapse"'
-        formatted_text = ctr.format_html(previous_text)
+    def test_form_cache(self):
+        ''' Check if form widgets are built once per model and reused '''
+
+        ctr.change_reservation()
+        ctr.worker_mgr.wait_for_done()
+        widgets = ctr.form_widgets[Reservation]
+        children = ctr.find_form_children()
+        ctr.navigate_top(1)
+        self.assertEqual(ctr.find_form_children(), children)
+
+        ctr.change_customer()
+        ctr.worker_mgr.wait_for_done()
+        self.assertFalse(any(x.isVisibleTo(ctr.form) for x in widgets))
+        ctr.change_reservation()
+        ctr.worker_mgr.wait_for_done()
+        self.assertIs(ctr.form_widgets[Reservation], widgets)
+        self.assertEqual(ctr.find_form_children(), children)
+        self.assertTrue(all(x.isVisibleTo(ctr.form) for x in widgets))
+
+
+    def test_delete_survives_screen_change(self):
+        ''' Check if a pending delete still reloads after changing screen '''
+
+        reloaded = []
+        ctr.worker_mgr.run('delete', reloaded.append, lambda: 'deleted')
+        ctr.change_customer()
+        ctr.worker_mgr.wait_for_done()
+        self.assertEqual(reloaded, ['deleted'])
+        ctr.change_reservation()
+        ctr.worker_mgr.wait_for_done()
+
+
+    def test_assign_once(self):
+        ''' Check if assigning again while it runs is ignored '''
+
+        started, release = Event(), Event()
+        calls = []
+
+        def assign():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 0, 0
+
+        with patch.object(ctr.schedule_mgr, 'assign_services', assign), \
+                patch.object(ctr, 'reload_after_assign'):
+            ctr.assign_services()
+            started.wait(5)
+            ctr.assign_services()
+            release.set()
+            ctr.worker_mgr.wait_for_done()
+        self.assertEqual(calls, [1])
+
+
+    def test_unassigned_message(self):
+        ''' Check if stages left without employee are reported instead of
+        the success message '''
+
+        with patch.object(ctr, 'show_success_message') as success, \
+                patch.object(ctr, 'show_unassigned_message') as unassigned, \
+                patch.object(ctr, 'reset_screen'):
+            ctr.reload_after_assign((3, 2))
+            ctr.reload_after_assign((3, 0))
+        unassigned.assert_called_once_with(3, 2)
+        success.assert_called_once()
+        text = ctr.lang_mgr.translate('unassigned_message')
+        self.assertIn('2', text.format(created=3, unassigned=2))
+
+
+    def test_print_preview_pages(self):
+        ''' Check if the preview gets no more than PRINT_PREVIEW_PAGES '''
+
+        from PyQt5.QtPrintSupport import QPrintPreviewWidget
+        rows = [(x, f'customer {x}') for x in range(1000)]
+        columns = ['id', 'customer']
+        preview = QPrintPreviewWidget()
+        preview.paintRequested.connect(
+            lambda x: ctr.paint_pages(x, rows, columns, len(rows)))
+        with patch(
+                'apps.apartments.controllers.apartments_ctr.'
+                'PRINT_PREVIEW_PAGES', 2):
+            preview.updatePreview()
+        self.assertEqual(preview.pageCount(), 2)
+
+
+    def test_overlapping_reservation(self):
+        ''' Check if a reservation overlapping another one is refused '''
+
+        with read_session() as session:
+            old = session.query(Reservation).first()
+        new = Reservation(
+            apartment_id=old.apartment_id, checkin_date=old.checkin_date,
+            checkout_date=old.checkout_date)
+        self.assertFalse(ctr.is_available(new))
+        self.assertTrue(ctr.is_available(new, old.id))
+        self.assertTrue(ctr.is_available(Customer()))
+
+
+    def test_clear_search(self):
+        ''' Check if clearing the search pages the rows again, without
+        fetching the rows already loaded '''
+
+        ctr.change_reservation()
+        ctr.worker_mgr.wait_for_done()
+        with patch.object(page_query, '__defaults__', (None, 10)):
+            for text in ('Res', ''):
+                ctr.top_search.setText(text)
+                ctr.top_search_timer.stop()
+                ctr.search_top_table()
+                ctr.worker_mgr.wait_for_done()
+            model = ctr.top_table.model()
+            self.assertEqual(len(model.rows), 10)
+            while model.canFetchMore():
+                model.fetchMore()
+        ids = [x[0] for x in model.rows]
+        self.assertEqual(sorted(ids), sorted(set(ids)))
+        self.assertEqual(len(ids), ctr.top_count)
+
+
+    def test_partial_index_search(self):
+        ''' Check if the search finds rows not yet loaded in the index '''
+
+        with patch.object(ctr, 'top_index', IndexManager()), \
+                patch.object(page_query, '__defaults__', (None, 10)):
+            ctr.change_reservation()
+            ctr.worker_mgr.wait_for_done()
+            self.assertEqual(len(ctr.top_index.rows), 10)
+            with read_session() as session:
+                query = res_top_query().with_session(session)
+                last = query.order_by(Reservation.id.desc()).first()
+            ctr.top_search.setText(str(last.customer))
+            ctr.top_search_timer.stop()
+            ctr.search_top_table()
+            found = [x[0] for x in ctr.top_data]
+        self.assertIn(last.id, found)
+        ctr.change_reservation()
+        ctr.worker_mgr.wait_for_done()
+
+
+    def test_edit_error(self):
+        ''' Check if a record the database refuses shows the error message '''
+
+        ctr.change_reservation()
+        ctr.worker_mgr.wait_for_done()
+        ctr.navigate_top()
+        ctr.worker_mgr.wait_for_done()
+        customer = [
+            x for x in ctr.find_form_children()
+            if getattr(x, 'field', None) == 'customer_id'][0]
+        customer.setCurrentIndex(-1)
+        with patch.object(ctr, 'show_error_message') as show_error_message:
+            ctr.save_instance()
+        show_error_message.assert_called_once()
+
+
+    def test_availability_loaded(self):
+        ''' Check if the reservation screen indexes the reservations in
+        background, dropping the index if a reservation changed meanwhile '''
+
+        ctr.availability_mgr.invalidate()
+        ctr.change_reservation()
+        ctr.availability_mgr.remove(0)
+        ctr.worker_mgr.wait_for_done()
+        self.assertIsNone(ctr.availability_mgr.apartments)
+        ctr.change_reservation()
+        ctr.worker_mgr.wait_for_done()
+        self.assertIsNotNone(ctr.availability_mgr.apartments)
+
+
+    def test_invalidate_caches(self):
+        ''' Check if deleting a reservation keeps the availability index,
+        while deleting a form record drops every cache '''
+
+        ctr.change_reservation()
+        ctr.worker_mgr.wait_for_done()
+        ctr.analytics_mgr.set_report(
+            {'group': 'owner', 'first': None, 'last': None})
+        ctr.invalidate_caches(Reservation, 0)
+        self.assertIsNotNone(ctr.availability_mgr.apartments)
+        self.assertFalse(ctr.analytics_mgr.reports)
+        ctr.invalidate_caches()
+        self.assertIsNone(ctr.availability_mgr.apartments)
+        self.assertFalse(ctr.lookup_mgr.lookups)
+        self.assertFalse(ctr.instance_mgr.instances)
+
+
+    def test_analytics(self):
+        ''' Check if the analytics screen shows a row per apartment, cached
+        until a record is saved '''
+
+        with read_session() as session:
+            first = session.query(func.min(Reservation.checkin_date)).scalar()
+            apartments = session.query(Apartment).count()
+        ctr.open_analytics()
+        view = ctr.analytics_controller.view
+        view.from_date.setDate(QDate(first.year, 1, 1))
+        view.to_date.setDate(QDate(first.year, 12, 31))
+        ctr.worker_mgr.wait_for_done()
+        self.assertEqual(
+            len(ctr.analytics_controller.table.model().rows), apartments)
+        self.assertTrue(ctr.analytics_mgr.reports)
+        ctr.update_availability(Apartment())
+        self.assertFalse(ctr.analytics_mgr.reports)
+        view.close()
+
+
+class QueryCountTest(TestCase):
+    ''' Check the number of statements issued by user actions '''
+
+    def test_screen_queries(self):
+        ''' Check if changing screens issues a bounded number of queries '''
+
+        screens = (
+            ctr.change_service, ctr.change_customer, ctr.change_employee,
+            ctr.change_agency, ctr.change_owner, ctr.change_apartment,
+            ctr.change_reservation)
+        for change_screen in screens:
+            with QueryCounter() as queries:
+                change_screen()
+                ctr.worker_mgr.wait_for_done()
+            self.assertLessEqual(queries.count, SCREEN_QUERIES)
+            self.assertEqual(queries.get_repeated(), [])
+
+
+    def test_navigation_queries(self):
+        ''' Check if the first top rows are served without queries '''
 
-        self.assertIn(expected_text, formatted_text)
+        ctr.change_service()
+        ctr.worker_mgr.wait_for_done()
+        with QueryCounter() as queries:
+            for _ in range(3):
+                ctr.navigate_top(1)
+                ctr.worker_mgr.wait_for_done()
+        self.assertEqual(queries.count, 0)
 
 
 if __name__ == '__main__':
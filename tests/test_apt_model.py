@@ -208,5 +208,52 @@ class DBClassesTest(TestCase):
         self.assertEqual(instance.__tablename__, 'service')
 
 
+class TableModelTest(TestCase):
+    ''' Check batched loading of the table model '''
+
+    def test_fetch_more(self):
+        ''' Check if rows are shown in batches as the table scrolls '''
+
+        rows = [(x, f'name {x}') for x in range(1, 501)]
+        model = xQTableModel(rows, ['id', 'name'], batch_size=200)
+
+        self.assertEqual(model.rowCount(), 200)
+        self.assertTrue(model.canFetchMore())
+        model.fetchMore()
+        model.fetchMore()
+        self.assertEqual(model.rowCount(), 500)
+        self.assertFalse(model.canFetchMore())
+
+
+    def test_fetch_pages(self):
+        ''' Check if pages are fetched once the loaded rows are shown '''
+
+        pages = [[(3, 'c'), (4, 'd')], [(5, 'e')], []]
+        model = xQTableModel(
+            [(1, 'a'), (2, 'b')], ['id', 'name'], lambda: pages.pop(0),
+            batch_size=2)
+
+        while model.canFetchMore():
+            model.fetchMore()
+        self.assertEqual(model.rowCount(), 5)
+        self.assertEqual(model.get_row_id(4), 5)
+        self.assertEqual(pages, [])
+
+
+    def test_sorted_pages(self):
+        ''' Check if pages fetched after sorting are sorted with the rest '''
+
+        pages = [[(3, 'a'), (4, 'y')], []]
+        model = xQTableModel(
+            [(1, 'x'), (2, 'b')], ['id', 'name'], lambda: pages.pop(0),
+            batch_size=2)
+
+        model.sort(1, Qt.DescendingOrder)
+        while model.canFetchMore():
+            model.fetchMore()
+        names = [model.rows[x][1] for x in range(model.rowCount())]
+        self.assertEqual(names, ['y', 'x', 'b', 'a'])
+
+
 if __name__ == '__main__':
     unittest.main()
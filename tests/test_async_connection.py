@@ -0,0 +1,37 @@
+import unittest
+from unittest import TestCase
+from importlib.util import find_spec
+from sqlalchemy.engine import make_url
+from common.connections.alchemy_cn import *
+from common.connections.async_cn import fetch_screen, run_sync
+from common.data.constants import ASYNC_CONN_STRING
+
+
+ASYNC_DRIVER = make_url(ASYNC_CONN_STRING).get_driver_name()
+
+
+@unittest.skipUnless(
+    find_spec('greenlet') and find_spec(ASYNC_DRIVER),
+    f'async driver {ASYNC_DRIVER} is not installed')
+class AsyncConnectionTest(TestCase):
+    ''' Check the async queries against their synchronous version '''
+
+    def test_fetch_screen(self):
+        ''' Check if first page, total and sub rows match the sync queries '''
+
+        rows, total, sub_rows = run_sync(
+            fetch_screen, res_top_query(), res_sub_query(), Reservation)
+        with read_session() as session:
+            query = res_top_query().with_session(session)
+            first_page = page_query(query, Reservation).all()
+            first_id = first_page[0].id
+            sub_query = res_sub_query().filter(Reservation.id == first_id)
+            expected_sub = sub_query.with_session(session).all()
+            expected_total = query.count()
+        self.assertEqual(rows, first_page)
+        self.assertEqual(total, expected_total)
+        self.assertEqual(sub_rows, expected_sub)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from datetime import date
+from unittest import TestCase
+from common.connections.alchemy_cn import *
+from common.managers.availability_mgr import AvailabilityManager, Calendar
+
+
+class CalendarTest(TestCase):
+    ''' Check the overlaps found in the reservations of an apartment '''
+
+    def setUp(self):
+        self.calendar = Calendar()
+        self.calendar.add(1, date(2021, 1, 1), date(2021, 3, 1))  # Long stay
+        self.calendar.add(2, date(2021, 1, 10), date(2021, 1, 15))
+        self.calendar.add(3, date(2021, 4, 1), date(2021, 4, 5))
+
+
+    def test_overlaps(self):
+        ''' Check if stays ending when another begins do not overlap '''
+
+        get_overlaps = self.calendar.get_overlaps
+        self.assertEqual(get_overlaps(date(2021, 3, 1), date(2021, 4, 1)), [])
+        self.assertEqual(get_overlaps(date(2021, 4, 4), date(2021, 4, 9)), [3])
+        overlaps = get_overlaps(date(2021, 2, 1), date(2021, 2, 2))
+        self.assertEqual(overlaps, [1])  # Found through the running maximum
+
+
+    def test_remove(self):
+        ''' Check if a removed stay frees its dates '''
+
+        self.calendar.remove(1, date(2021, 1, 1))
+        self.assertEqual(
+            self.calendar.get_overlaps(date(2021, 2, 1), date(2021, 2, 2)), [])
+        self.assertEqual(self.calendar.ids, [2, 3])
+
+
+class AvailabilityManagerTest(TestCase):
+    ''' Check the free apartments against the reservation table '''
+
+    def setUp(self):
+        self.availability_mgr = AvailabilityManager()
+        with read_session() as session:
+            self.reservation = session.query(Reservation).first()
+            self.apartments = session.query(Apartment).count()
+
+
+    def test_reserved_dates(self):
+        ''' Check if a reserved apartment is busy, except for its own stay '''
+
+        r = self.reservation
+        dates = (r.checkin_date, r.checkout_date)
+        self.assertFalse(self.availability_mgr.is_free(r.apartment_id, *dates))
+        self.assertTrue(
+            self.availability_mgr.is_free(r.apartment_id, *dates, r.id))
+        free = self.availability_mgr.get_free_apartments(*dates)
+        self.assertNotIn(r.apartment_id, free)
+        self.assertLess(len(free), self.apartments)
+
+
+    def test_guests(self):
+        ''' Check if apartments are filtered by their max guests '''
+
+        future = (date(2100, 1, 1), date(2100, 1, 2))
+        free = self.availability_mgr.get_free_apartments(*future)
+        self.assertEqual(len(free), self.apartments)
+        with read_session() as session:
+            expected = session.query(Apartment.id).filter(
+                or_(Apartment.max_guests >= 4, Apartment.max_guests == None)
+                ).order_by(Apartment.id).all()
+        free = self.availability_mgr.get_free_apartments(*future, guests=4)
+        self.assertEqual(free, [x.id for x in expected])
+
+
+    def test_sync(self):
+        ''' Check if saved and deleted reservations update the index '''
+
+        r = self.reservation
+        self.availability_mgr.load()
+        new_dates = (date(2100, 1, 1), date(2100, 1, 10))
+        moved = Reservation(
+            id=r.id, apartment_id=r.apartment_id,
+            checkin_date=new_dates[0], checkout_date=new_dates[1])
+        self.availability_mgr.add(moved)
+        self.assertTrue(self.availability_mgr.is_free(
+            r.apartment_id, r.checkin_date, r.checkout_date))
+        self.assertFalse(
+            self.availability_mgr.is_free(r.apartment_id, *new_dates))
+        self.availability_mgr.remove(str(r.id))
+        self.assertTrue(
+            self.availability_mgr.is_free(r.apartment_id, *new_dates))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 from unittest import TestCase
 from common.connections.alchemy_cn import *
+from common.connections.alchemy_cn import main_engine
 
 
 class DatabaseTest(TestCase):
@@ -44,5 +45,47 @@ class DatabaseTest(TestCase):
                 self.assertGreaterEqual(records, 0)
 
 
+    def test_unit_of_work(self):
+        ''' Check if each unit of work gets its own session and commits '''
+
+        with unit_of_work() as first_session:
+            country = Country(country_name='Unit of work')
+            first_session.add(country)
+            first_session.flush()
+            country_id = country.id
+        with unit_of_work() as second_session:
+            condition = (Country.id == country_id)
+            saved = second_session.query(Country).filter(condition).one()
+            second_session.delete(saved)
+
+        self.assertIsNot(first_session, second_session)
+        with alch_session() as session:
+            self.assertEqual(session.query(Country).filter(condition).count(), 0)
+
+
+    def test_read_session(self):
+        ''' Check if read sessions never commit their changes '''
+
+        with read_session() as session:
+            session.add(Country(country_name='Read only'))
+            session.flush()
+        with alch_session() as session:
+            condition = (Country.country_name == 'Read only')
+            self.assertEqual(session.query(Country).filter(condition).count(), 0)
+
+
+    def test_search_query(self):
+        ''' Check if search filters are pushed into the query '''
+
+        query = res_top_query()
+
+        self.assertIs(search_query(query, ''), query)
+        with read_session() as session:
+            query = query.with_session(session)
+            self.assertEqual(search_query(query, '%_no_match_%').all(), [])
+            for row in search_query(query, '1').all():
+                self.assertTrue(any('1' in str(value) for value in row))
+
+
 if __name__ == '__main__':
     unittest.main()
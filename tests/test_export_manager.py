@@ -0,0 +1,101 @@
+import csv
+import json
+import unittest
+import tempfile
+from datetime import date
+from unittest import TestCase
+from unittest.mock import patch
+from importlib.util import find_spec
+from PyQt5.QtWidgets import QApplication
+from common.connections.alchemy_cn import *
+from common.managers.export_mgr import ExportManager, ArrowWriter
+from common.managers.export_mgr import get_writers
+import sys
+
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+class ExportManagerTest(TestCase):
+    ''' Check the streamed export files '''
+
+    def setUp(self):
+        self.export_mgr = ExportManager()
+        self.progress = []
+        self.export_mgr.progress.connect(
+            lambda *args: self.progress.append(args))
+        self.query = res_top_query().order_by(Reservation.id)
+        self.columns = [x['name'] for x in self.query.column_descriptions]
+        self.types = [x['type'] for x in self.query.column_descriptions]
+        with read_session() as session:
+            self.rows = self.query.with_session(session).all()
+
+
+    def test_query_export(self):
+        ''' Check if every format gets the rows streamed from the query '''
+
+        with tempfile.TemporaryDirectory() as folder:
+            paths = self.export_mgr.export(
+                self.query, self.columns, self.types, folder, len(self.rows))
+            with open(paths[0], newline='', encoding='utf-8') as file:
+                lines = list(csv.reader(file))
+            with open(paths[1], encoding='utf-8') as file:
+                records = [json.loads(x) for x in file]
+            with open(paths[2], encoding='utf-8') as file:
+                html_text = file.read()
+
+        self.assertEqual(lines[0], self.columns)
+        self.assertEqual(len(lines) - 1, len(self.rows))
+        self.assertEqual([x['id'] for x in records], [x.id for x in self.rows])
+        self.assertEqual(html_text.count('<tr>'), len(self.rows) + 1)
+        self.assertEqual(self.progress[-1], (len(self.rows), len(self.rows)))
+
+
+    def test_list_export(self):
+        ''' Check if rows already loaded are exported too '''
+
+        rows = self.rows[:3]
+        with tempfile.TemporaryDirectory() as folder:
+            paths = self.export_mgr.export(
+                rows, self.columns, self.types, folder, 3)
+            with open(paths[1], encoding='utf-8') as file:
+                records = [json.loads(x) for x in file]
+        self.assertEqual([x['id'] for x in records], [x.id for x in rows])
+
+
+    @unittest.skipUnless(find_spec('pyarrow'), 'pyarrow is not installed')
+    def test_columnar_export(self):
+        ''' Check if Parquet and Feather keep the column types, split in
+        row groups of the configured size '''
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        with tempfile.TemporaryDirectory() as folder, patch(
+                'common.managers.export_mgr.EXPORT_ROW_GROUP_SIZE', 2):
+            paths = self.export_mgr.export(
+                self.query, self.columns, self.types, folder, len(self.rows))
+            parquet = pq.ParquetFile(paths[3])
+            groups = parquet.metadata.num_row_groups
+            table = parquet.read()
+            with pa.memory_map(paths[4]) as file:
+                feather = pa.ipc.open_file(file).read_all()
+
+        self.assertEqual(len(paths), len(get_writers()))
+        self.assertEqual(table.num_rows, len(self.rows))
+        self.assertEqual(groups, (len(self.rows) + 1) // 2)
+        self.assertEqual(table.schema.field('amount').type, pa.float64())
+        self.assertEqual(table.schema.field('checkin_date').type, pa.date32())
+        self.assertIsInstance(table.column('checkin_date')[0].as_py(), date)
+        self.assertEqual(table.column('id').to_pylist(), [x.id for x in self.rows])
+        self.assertTrue(feather.equals(table))
+
+
+    def test_arrow_base(self):
+        ''' Check if the columnar writers base needs its file methods '''
+
+        with self.assertRaises(TypeError):
+            ArrowWriter(None, self.columns, self.types)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from unittest import TestCase
+from common.managers.index_mgr import IndexManager
+
+
+ROWS = [
+    (1, 'Rosie Smith', 'Booking', 'Sea View', '2020-01-05'),
+    (2, 'Pierre Dupont', 'Airbnb', 'Old Town', '2020-01-12'),
+    (3, 'Ana Ruiz', 'Booking', 'Sea Breeze', '2020-02-01')]
+
+
+class IndexManagerTest(TestCase):
+    ''' Check trigram search and incremental updates '''
+
+    def setUp(self):
+        self.index = IndexManager()
+        self.index.build(ROWS)
+
+
+    def test_search(self):
+        ''' Check if substring search matches any column ignoring case '''
+
+        self.assertEqual(self.index.search('booking'), [ROWS[0], ROWS[2]])
+        self.assertEqual(self.index.search('SEA B'), [ROWS[2]])
+        self.assertEqual(self.index.search('2020-01'), ROWS[:2])
+        self.assertEqual(self.index.search('xyz'), [])
+
+
+    def test_short_search(self):
+        ''' Check if searches shorter than a trigram scan the rows '''
+
+        self.assertEqual(self.index.search(''), ROWS)
+        self.assertEqual(self.index.search('ui'), [ROWS[2]])
+
+
+    def test_columns_are_not_joined(self):
+        ''' Check if a match can not span two columns '''
+
+        self.assertEqual(self.index.search('smithbooking'), [])
+
+
+    def test_refresh(self):
+        ''' Check if refreshed rows keep their position '''
+
+        row = (2, 'Pierre Martin', 'Airbnb', 'Old Town', '2020-01-12')
+        self.index.refresh(2, row)
+
+        self.assertEqual(self.index.search('dupont'), [])
+        self.assertEqual(self.index.search('2020'), [ROWS[0], row, ROWS[2]])
+
+
+    def test_remove(self):
+        ''' Check if removed rows and their trigrams are dropped '''
+
+        self.index.refresh(1, None)
+        self.index.remove(1)
+
+        self.assertEqual(self.index.search('smith'), [])
+        self.assertNotIn('smi', self.index.trigrams)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from unittest import TestCase
+from common.connections.alchemy_cn import *
+from common.managers.instance_mgr import InstanceManager
+
+
+class InstanceManagerTest(TestCase):
+    ''' Check the LRU cache of form instances '''
+
+    def setUp(self):
+        self.instance_mgr = InstanceManager(size=2)
+        with read_session() as session:
+            self.customers = session.query(Customer).limit(3).all()
+            self.country = session.query(Country).first()
+
+
+    def test_hits_and_misses(self):
+        ''' Check if cached instances are counted as hits by any id type '''
+
+        customer = self.customers[0]
+        self.assertIsNone(self.instance_mgr.get(Customer, customer.id))
+        self.instance_mgr.add(customer)
+        cached = self.instance_mgr.get(Customer, str(customer.id))
+        self.assertIs(cached, customer)
+        self.assertEqual(self.instance_mgr.hits, 1)
+        self.assertEqual(self.instance_mgr.misses, 1)
+
+
+    def test_least_recently_used(self):
+        ''' Check if the least recently used instance is dropped '''
+
+        first, second, third = self.customers
+        self.instance_mgr.add(first)
+        self.instance_mgr.add(second)
+        self.instance_mgr.get(Customer, first.id)
+        self.instance_mgr.add(third)
+        self.assertIsNone(self.instance_mgr.get(Customer, second.id))
+        self.assertIs(self.instance_mgr.get(Customer, first.id), first)
+        self.assertEqual(self.instance_mgr.get_stats()['cached'], 2)
+
+
+    def test_invalidate(self):
+        ''' Check if instances are dropped by id, by model or all at once '''
+
+        first, second, _ = self.customers
+        self.instance_mgr.add(first)
+        self.instance_mgr.add(self.country)
+        self.instance_mgr.invalidate(Customer, first.id)
+        self.assertIsNone(self.instance_mgr.get(Customer, first.id))
+
+        self.instance_mgr.add(second)
+        self.instance_mgr.invalidate(Customer)
+        self.assertIsNone(self.instance_mgr.get(Customer, second.id))
+        self.assertIsNotNone(self.instance_mgr.get(Country, self.country.id))
+        self.instance_mgr.invalidate()
+        self.assertEqual(self.instance_mgr.instances, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
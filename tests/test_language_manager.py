@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+from unittest import TestCase, mock
+from common.managers.language_mgr import LangManager, get_lang_manager
+
+
+class LangManagerTest(TestCase):
+    ''' Check dictionary lookups of the translation service '''
+
+    def setUp(self):
+        self.lang_mgr = LangManager()
+        self.lang_mgr.change_language('spanish')
+
+
+    def test_shared_instance(self):
+        ''' Check if every controller gets the same translation service '''
+
+        self.assertIs(get_lang_manager(), get_lang_manager())
+
+
+    def test_translate(self):
+        ''' Check if words are translated to the active language '''
+
+        self.assertEqual(self.lang_mgr.translate('customer'), 'Cliente')
+        self.lang_mgr.change_language('french')
+        self.assertEqual(self.lang_mgr.translate('customer'), 'Client')
+        self.assertIsNone(self.lang_mgr.translate('missing_word'))
+
+
+    def test_translate_many(self):
+        ''' Check if bulk translation keeps the words order '''
+
+        words = ['customer', 'missing_word', 'customer_nav_btn']
+        self.assertEqual(
+            self.lang_mgr.translate_many(words),
+            ['Cliente', None, 'Clientes'])
+
+
+    def test_bundle(self):
+        ''' Check if the bundle is used only while it matches the database '''
+
+        folder = tempfile.mkdtemp()
+        path = os.path.join(folder, 'dictionary.bundle')
+        with mock.patch(
+                'common.managers.language_mgr.DICTIONARY_BUNDLE_PATH', path):
+            self.assertIsNone(LangManager.load_bundle())
+            dictionaries = LangManager.compile_bundle()
+            self.assertEqual(LangManager.load_bundle(), dictionaries)
+            self.assertEqual(dictionaries, LangManager.load_dictionaries())
+
+            stamp = LangManager.get_source_stamp()
+            with mock.patch.object(
+                    LangManager, 'get_source_stamp',
+                    return_value=(stamp[0] + 1, stamp[1])):
+                self.assertIsNone(LangManager.load_bundle())
+
+
+if __name__ == '__main__':
+    unittest.main()
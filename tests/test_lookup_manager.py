@@ -0,0 +1,50 @@
+import unittest
+from unittest import TestCase
+from PyQt5.QtWidgets import QApplication
+from common.connections.alchemy_cn import *
+from common.managers.lookup_mgr import LookupManager
+import sys
+
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+class LookupManagerTest(TestCase):
+    ''' Check the form combo lookups cache '''
+
+    def setUp(self):
+        self.lookup_mgr = LookupManager()
+        self.combos = [
+            xQCountryComboBox(), xQCityComboBox(), xQCustomerComboBox()]
+
+
+    def test_get_lookups(self):
+        ''' Check if lookups match the id and text of every instance '''
+
+        lookups = self.lookup_mgr.get_lookups(self.combos)
+        with alch_session() as session:
+            countries = session.query(Country.id, Country.country_name).all()
+            customers = session.query(Customer).all()
+        self.assertEqual(lookups[Country], [tuple(x) for x in countries])
+        self.assertEqual(
+            sorted(lookups[Customer]),
+            sorted((x.id, f'{x.first_name} {x.last_name}') for x in customers))
+
+
+    def test_invalidate(self):
+        ''' Check if only invalidated models are loaded again '''
+
+        lookups = self.lookup_mgr.get_lookups(self.combos)
+        self.lookup_mgr.invalidate(City)
+        self.assertNotIn(City, self.lookup_mgr.lookups)
+        again = self.lookup_mgr.get_lookups(self.combos)
+        self.assertIs(again[Country], lookups[Country])
+        self.assertIsNot(again[City], lookups[City])
+        self.assertEqual(again[City], lookups[City])
+
+        self.lookup_mgr.invalidate()
+        self.assertEqual(self.lookup_mgr.lookups, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+from unittest import TestCase
+from common.connections.alchemy_cn import *
+from common.managers.prefetch_mgr import PrefetchManager
+
+
+class PrefetchManagerTest(TestCase):
+    ''' Check the prefetched data of the first top rows '''
+
+    def setUp(self):
+        self.prefetch_mgr = PrefetchManager()
+        with read_session() as session:
+            query = res_top_query().with_session(session)
+            self.top_ids = [x[0] for x in page_query(query, Reservation)]
+            self.top_ids = self.top_ids[:5]
+            self.prefetch_mgr.set_rows(self.prefetch_mgr.load_rows(
+                session, res_sub_query(), Reservation, self.top_ids))
+
+
+    def test_sub_rows(self):
+        ''' Check if prefetched sub rows match the sub query of every row '''
+
+        for top_id in self.top_ids:
+            with read_session() as session:
+                condition = (Reservation.id == top_id)
+                query = res_sub_query().filter(condition)
+                rows = query.with_session(session).all()
+            prefetched = self.prefetch_mgr.get_sub_rows(top_id)
+            self.assertEqual(prefetched, [tuple(x) for x in rows])
+
+
+    def test_form_data(self):
+        ''' Check if instances and document paths match every row '''
+
+        for top_id in self.top_ids:
+            instance, paths = self.prefetch_mgr.get_form_data(top_id)
+            with alch_session() as session:
+                condition = (Document.foreign_entity_id == instance.entity_id)
+                query = session.query(Document.file_path).filter(condition)
+                self.assertEqual(sorted(paths), sorted(x for x, in query))
+            self.assertEqual(instance.id, top_id)
+
+
+    def test_invalidate(self):
+        ''' Check if invalidated rows are not served any more '''
+
+        self.prefetch_mgr.invalidate()
+        self.assertIsNone(self.prefetch_mgr.get_sub_rows(self.top_ids[0]))
+        self.assertIsNone(self.prefetch_mgr.get_form_data(self.top_ids[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
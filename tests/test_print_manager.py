@@ -0,0 +1,66 @@
+import os
+import unittest
+import tempfile
+from unittest import TestCase
+from PyQt5.QtGui import QPdfWriter
+from PyQt5.QtWidgets import QApplication
+from common.connections.alchemy_cn import *
+from common.managers.print_mgr import PrintManager
+import sys
+
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+class PrintManagerTest(TestCase):
+    ''' Check the pages painted from rows '''
+
+    def setUp(self):
+        self.print_mgr = PrintManager()
+        self.progress = []
+        self.print_mgr.progress.connect(
+            lambda *args: self.progress.append(args))
+        self.rows = [(x, f'customer {x}', None) for x in range(500)]
+        self.columns = ['id', 'customer', 'notes']
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, 'data.pdf')
+
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+
+    def test_every_page(self):
+        ''' Check if every row is painted, in more than one page '''
+
+        writer = QPdfWriter(self.path)
+        pages = self.print_mgr.paint(
+            writer, self.rows, self.columns, len(self.rows))
+        self.assertGreater(pages, 1)
+        self.assertEqual(self.progress[-1], (500, 500))
+
+
+    def test_page_range(self):
+        ''' Check if only the pages asked for are painted '''
+
+        writer = QPdfWriter(self.path)
+        pages = self.print_mgr.paint(
+            writer, self.rows, self.columns, len(self.rows), 2, 3)
+        self.assertEqual(pages, 2)
+        self.assertEqual(len(self.progress), 2)
+
+
+    def test_query_pdf(self):
+        ''' Check if rows streamed from a query are written to a PDF file '''
+
+        query = res_top_query().order_by(Reservation.id)
+        columns = [x['name'] for x in query.column_descriptions]
+        with read_session() as session:
+            total = query.with_session(session).count()
+        path = self.print_mgr.write_pdf(query, columns, self.path, total)
+        with open(path, 'rb') as file:
+            self.assertEqual(file.read(4), b'%PDF')
+
+
+if __name__ == '__main__':
+    unittest.main()
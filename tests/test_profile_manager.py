@@ -0,0 +1,68 @@
+import unittest
+from unittest import TestCase
+from PyQt5.QtWidgets import QApplication, QStatusBar
+from common.connections.alchemy_cn import *
+from common.managers.profile_mgr import ProfileManager
+from common.managers.worker_mgr import WorkerManager
+import sys
+
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+class ProfileManagerTest(TestCase):
+    ''' Check the figures measured for every action '''
+
+    def setUp(self):
+        self.worker_mgr = WorkerManager()
+        self.status_bar = QStatusBar()
+        self.profile_mgr = ProfileManager(
+            self.worker_mgr, self.status_bar, enabled=True)
+
+    def tearDown(self):
+        self.profile_mgr.close()
+
+
+    def test_statements(self):
+        ''' Check if statements and rendered rows are added to the action '''
+
+        with self.profile_mgr.action('query'):
+            with read_session() as session:
+                rows = session.query(Country).all()
+                session.query(City).first()
+            with self.profile_mgr.render(len(rows)):
+                pass
+        profile = self.profile_mgr.history[-1]
+        self.assertEqual(profile['action'], 'query')
+        self.assertEqual(profile['sql'], 2)
+        self.assertEqual(profile['rows'], len(rows))
+        self.assertIn('SQL 2', self.profile_mgr.label.text())
+
+
+    def test_nested_actions(self):
+        ''' Check if nested actions belong to the outer one '''
+
+        slot = self.profile_mgr.track('outer', lambda: self.inner_action())
+        slot()
+        self.assertEqual(self.profile_mgr.history[-1]['action'], 'outer')
+        self.assertEqual(self.profile_mgr.history[-1]['sql'], 1)
+
+    def inner_action(self):
+        with self.profile_mgr.action('inner'):
+            with read_session() as session:
+                session.query(Country).first()
+
+
+    def test_disabled(self):
+        ''' Check if nothing is measured when profiling is off '''
+
+        profile_mgr = ProfileManager(self.worker_mgr, None, enabled=False)
+        function = lambda: None
+        self.assertIs(profile_mgr.track('name', function), function)
+        with profile_mgr.action('name'):
+            pass
+        self.assertEqual(len(profile_mgr.history), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+from unittest import TestCase
+from common.connections.alchemy_cn import *
+from common.managers.query_mgr import QueryCounter, normalize
+
+
+class QueryCounterTest(TestCase):
+    ''' Check the statement shapes, repeated and slow statements '''
+
+    def test_normalize(self):
+        ''' Check if values and list lengths do not change the shape '''
+
+        self.assertEqual(
+            normalize("SELECT a FROM t WHERE id IN (?, ?, ?) AND b = 'x'"),
+            normalize("SELECT a\n FROM t WHERE id IN (?) AND b = 'y z'"))
+        self.assertNotEqual(
+            normalize('SELECT a FROM t LIMIT 10'),
+            normalize('SELECT b FROM t LIMIT 10'))
+
+
+    def test_repeated(self):
+        ''' Check if a query per row is flagged as N+1 '''
+
+        with QueryCounter(limit=3) as queries:
+            with read_session() as session:
+                for country_id in (1, 2, 3):
+                    condition = (Country.id == country_id)
+                    session.query(Country).filter(condition).all()
+                session.query(City).all()
+        self.assertEqual(queries.count, 4)
+        [(shape, count)] = queries.get_repeated()
+        self.assertEqual(count, 3)
+        self.assertIn('country', shape)
+
+
+    def test_slow(self):
+        ''' Check if statements above the threshold are reported '''
+
+        with QueryCounter(slow_ms=-1) as queries:
+            with read_session() as session:
+                session.query(Country).all()
+        self.assertEqual(len(queries.get_slow()), 1)
+        self.assertEqual(queries.get_report()['sql'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
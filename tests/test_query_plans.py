@@ -0,0 +1,75 @@
+import unittest
+from unittest import TestCase
+from common.connections.alchemy_cn import *
+from common.connections.alchemy_cn import main_engine
+
+
+# Small lookup tables that the optimizer may read whole to drive a join
+LOOKUP_TABLES = {
+    'country', 'city', 'employee_category', 'service_type',
+    'service_category'}
+
+SCREENS = [
+    (Reservation, res_top_query, res_sub_query),
+    (Service, srv_top_query, srv_sub_query),
+    (Customer, cus_top_query, cus_sub_query),
+    (Employee, emp_top_query, emp_sub_query),
+    (Agency, agn_top_query, agn_sub_query),
+    (Owner, own_top_query, own_sub_query),
+    (Apartment, apt_top_query, apt_sub_query)]
+
+
+def get_full_scans(query):
+    ''' Return the tables read with a full scan in the query plan '''
+
+    options = {}
+    if (schemas := main_engine.get_execution_options().get(
+            'schema_translate_map')):
+        options = {
+            'schema_translate_map': schemas, 'render_schema_translate': True}
+    with main_engine.connect() as connection:
+        # Compiled once connected, when the default schema is known
+        statement = query.statement.compile(
+            connection, compile_kwargs={'literal_binds': True}, **options)
+        if main_engine.dialect.name == 'sqlite':
+            plan = connection.exec_driver_sql(
+                f'EXPLAIN QUERY PLAN {statement}').fetchall()
+            details = [x[-1].split() for x in plan]
+            tables = [x[1] for x in details if x[0] == 'SCAN']
+        else:
+            plan = connection.exec_driver_sql(
+                f'EXPLAIN {statement}').mappings().fetchall()
+            tables = [x['table'] for x in plan if x['type'] == 'ALL']
+    return set(tables) - LOOKUP_TABLES
+
+
+class QueryPlanTest(TestCase):
+    ''' Check that screen queries are served by indexes '''
+
+    def test_top_queries(self):
+        ''' Check if top pages are read through the primary key '''
+
+        for model, top_query, _ in SCREENS:
+            query = page_query(top_query(), model, last_id=0)
+            self.assertEqual(get_full_scans(query), set(), model.__name__)
+
+
+    def test_sub_queries(self):
+        ''' Check if sub tables are read through secondary indexes '''
+
+        for model, _, sub_query in SCREENS:
+            query = sub_query().filter(model.id == 1)
+            self.assertEqual(get_full_scans(query), set(), model.__name__)
+
+
+    def test_document_query(self):
+        ''' Check if attachments are read through their entity index '''
+
+        with alch_session() as session:
+            query = session.query(Document)
+            query = query.filter(Document.foreign_entity_id == 1)
+        self.assertEqual(get_full_scans(query), set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+from datetime import date
+from sqlalchemy import and_
+from unittest import TestCase
+from common.connections.alchemy_cn import *
+from common.managers.schedule_mgr import *
+
+
+class ScheduleTest(TestCase):
+    ''' Check the employees booked by the schedule '''
+
+    def setUp(self):
+        self.schedule = Schedule()
+        self.day = date(2021, 6, 1)
+        for employee_id in range(1, 3):
+            self.schedule.add_employee(employee_id, HOST)
+        for employee_id in range(3, 5):
+            self.schedule.add_employee(employee_id, CLEANER)
+
+
+    def test_taking_turns(self):
+        ''' Check if free employees of the category take turns '''
+
+        get_free = self.schedule.get_free_employee
+        self.assertEqual(get_free(self.day, 10, HOST), 1)
+        self.assertEqual(get_free(self.day, 10, HOST), 2)
+        self.assertEqual(get_free(self.day, 10, CLEANER), 3)
+        self.schedule.book(1, self.day, 9, hours=2)
+        self.assertEqual(get_free(self.day, 10, HOST), 2)
+        self.assertEqual(get_free(self.day, 11, HOST, hours=2), 1)
+
+
+    def test_contract_dates(self):
+        ''' Check if employees are only booked while hired '''
+
+        self.schedule.add_employee(5, HOST, start=date(2021, 7, 1))
+        self.schedule.book(1, self.day, 10)
+        self.schedule.book(2, self.day, 10)
+        self.assertIsNone(self.schedule.get_free_employee(self.day, 10, HOST))
+
+
+    def test_full_stage(self):
+        ''' Check if a stage is refused when every host is busy '''
+
+        for hour in STAGES[CHECK_OUT][0]:
+            for employee_id in (1, 2):
+                self.schedule.book(employee_id, self.day, hour)
+        self.assertIsNone(self.schedule.assign_stage(self.day, CHECK_OUT))
+        self.assertIsNotNone(self.schedule.assign_stage(self.day, CHECK_IN))
+
+
+    def test_many_reservations(self):
+        ''' Check if thousands of stages a day never share an employee '''
+
+        schedule = Schedule()
+        for employee_id in range(1000):
+            category_id = HOST if employee_id % 2 else CLEANER
+            schedule.add_employee(employee_id, category_id)
+        booked = set()
+        for _ in range(5000):
+            services = schedule.assign_stage(self.day, CHECK_IN)
+            self.assertIsNotNone(services)
+            for employee_id, category_id, hour in services:
+                self.assertNotIn((employee_id, hour), booked)
+                booked.add((employee_id, hour))
+
+
+class ScheduleManagerTest(TestCase):
+    ''' Check the services created for reservations missing them '''
+
+    def test_assign_services(self):
+        ''' Check if a removed check-in gets a host and a cleaning again '''
+
+        with unit_of_work() as session:
+            reservation = session.query(Reservation).first()
+            condition = and_(
+                Service.reservation_id == reservation.id,
+                Service.date == reservation.checkin_date)
+            session.query(Service).filter(condition).delete(
+                synchronize_session=False)
+
+        created, unassigned = ScheduleManager().assign_services()
+        self.assertEqual((created, unassigned), (2, 0))
+        with read_session() as session:
+            services = session.query(Service).filter(condition).order_by(
+                Service.s_category_id).all()
+            host, cleaning = services
+            self.assertEqual(host.employee.e_category_id, HOST)
+            self.assertEqual(cleaning.employee.e_category_id, CLEANER)
+            self.assertEqual(ScheduleManager.get_missing_stages(session), [])
+        self.assertEqual(
+            [x.s_category_id for x in services], [CHECK_IN, CLEANING])
+        self.assertEqual(cleaning.time.hour, host.time.hour - 1)
+
+if __name__ == '__main__':
+    unittest.main()
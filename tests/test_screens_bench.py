@@ -0,0 +1,27 @@
+import sys
+import json
+import unittest
+import subprocess
+from unittest import TestCase
+
+
+class ScreensBenchTest(TestCase):
+    ''' Check the screen benchmark on a tiny SQLite database '''
+
+    def test_results(self):
+        ''' Check if every screen and interaction gets a timing '''
+
+        process = subprocess.run(
+            [sys.executable, 'benchmarks/screens_bench.py', '100',
+             '--runs', '1', '--reseed'],
+            capture_output=True, text=True, check=True)
+        result = json.loads(process.stdout)['sizes']['100']
+
+        self.assertGreater(result['reservations'], 0)
+        for name in ('screen_reservation', 'screen_apartment', 'navigate_top',
+                     'search_text', 'save', 'delete', 'export_top'):
+            self.assertGreaterEqual(result['operations'][name]['median_ms'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import sys
+import json
+import unittest
+import subprocess
+from unittest import TestCase
+
+
+CHECK_IMPORTS = '''
+import sys, json
+import apps.apartments.controllers.apartments_ctr
+from common.connections.alchemy_cn import get_engine
+from common.managers.startup_mgr import DEFERRED_MODULES
+print(json.dumps({
+    'loaded': [x for x in DEFERRED_MODULES if x in sys.modules],
+    'engines': get_engine.cache_info().currsize}))
+'''
+
+
+class StartupTest(TestCase):
+    ''' Check that startup keeps heavy work deferred '''
+
+    def test_deferred_imports(self):
+        ''' Check if the controller import skips deferred modules and engine '''
+
+        process = subprocess.run(
+            [sys.executable, '-c', CHECK_IMPORTS],
+            capture_output=True, text=True, check=True)
+        result = json.loads(process.stdout.splitlines()[-1])
+
+        self.assertEqual(result['loaded'], [])
+        self.assertEqual(result['engines'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
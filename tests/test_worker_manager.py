@@ -0,0 +1,98 @@
+import sys
+import time
+import unittest
+import subprocess
+from unittest import TestCase
+from PyQt5.QtWidgets import QApplication
+from common.managers.worker_mgr import WorkerManager
+
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+QUIT_WHILE_RUNNING = '''
+import sys, time
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication
+from common.managers.worker_mgr import WorkerManager
+app = QApplication(sys.argv)
+worker_mgr = WorkerManager(max_threads=2)
+app.aboutToQuit.connect(worker_mgr.shutdown)
+worker_mgr.run('slow', print, time.sleep, 0.5)
+QTimer.singleShot(0, app.quit)
+app.exec_()
+print('running', list(worker_mgr.workers))
+'''
+
+
+def slow_square(number, delay=0.05):
+    time.sleep(delay)
+    return number * number
+
+
+class WorkerManagerTest(TestCase):
+    ''' Check background requests, cancellation and error reporting '''
+
+    def setUp(self):
+        self.worker_mgr = WorkerManager(max_threads=2)
+        self.results = []
+        self.errors = []
+        self.busy = []
+        self.worker_mgr.failed.connect(self.errors.append)
+        self.worker_mgr.busy_changed.connect(self.busy.append)
+
+
+    def test_result_callback(self):
+        ''' Check if results reach the callback in the calling thread '''
+
+        self.worker_mgr.run('square', self.results.append, slow_square, 3)
+        self.assertEqual(self.results, [])
+        self.worker_mgr.wait_for_done()
+
+        self.assertEqual(self.results, [9])
+        self.assertEqual(self.busy, [True, False])
+
+
+    def test_cancel_previous(self):
+        ''' Check if a new request of the same key drops the previous one '''
+
+        self.worker_mgr.run('square', self.results.append, slow_square, 2)
+        self.worker_mgr.run('square', self.results.append, slow_square, 4)
+        self.worker_mgr.run('other', self.results.append, slow_square, 5)
+        self.worker_mgr.wait_for_done()
+
+        self.assertEqual(sorted(self.results), [16, 25])
+
+
+    def test_failed(self):
+        ''' Check if worker errors are reported instead of the result '''
+
+        self.worker_mgr.run('fail', self.results.append, slow_square, None)
+        self.worker_mgr.wait_for_done()
+
+        self.assertEqual(self.results, [])
+        self.assertIsInstance(self.errors[0], TypeError)
+
+
+    def test_synchronous(self):
+        ''' Check if requests run inline without worker threads '''
+
+        worker_mgr = WorkerManager(max_threads=0)
+        worker_mgr.run('square', self.results.append, slow_square, 3, 0)
+
+        self.assertEqual(self.results, [9])
+
+
+    def test_quit_while_running(self):
+        ''' Check if quitting the application waits for running requests
+        instead of letting them emit on deleted signals '''
+
+        process = subprocess.run(
+            [sys.executable, '-c', QUIT_WHILE_RUNNING],
+            capture_output=True, text=True)
+
+        self.assertEqual(process.returncode, 0, process.stderr)
+        self.assertEqual(process.stdout.splitlines()[-1], 'running []')
+
+
+if __name__ == '__main__':
+    unittest.main()